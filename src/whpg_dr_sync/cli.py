@@ -3,21 +3,26 @@ from __future__ import annotations
 import argparse
 import sys
 import time
+from collections import deque
 from pathlib import Path
+from typing import Any, Deque, List, Optional, Tuple
 
-from .config import load_config
 from .service import status as pid_status, stop as pid_stop
-from .common import ShutdownRequested
+from .common import ShutdownRequested, _STOP_EVENT, _request_stop
 
 import signal
 
 def install_signal_handlers() -> None:
     """
     Make SIGTERM behave like Ctrl+C so systemd stop/shutdown exits cleanly
-    without tracebacks.
+    without tracebacks. The first signal requests a stop (check_stop,
+    sleep_or_stop and the inotify wait see it, and workers finish their
+    current step); a second one interrupts whatever is still running.
     """
     def _handler(signum, frame):
-        raise KeyboardInterrupt()
+        if _STOP_EVENT.is_set():
+            raise KeyboardInterrupt()
+        _request_stop(signum, frame)
 
     signal.signal(signal.SIGTERM, _handler)
     signal.signal(signal.SIGINT, _handler)
@@ -27,66 +32,148 @@ def _tail_file(path: Path, n: int = 50) -> None:
     if not path.exists():
         print(f"[logs] not found: {path}")
         return
-    lines = path.read_text().splitlines()[-n:]
+    # Read backwards from EOF in 8 KiB chunks until we have n lines,
+    # instead of loading the whole file.
+    chunks: Deque[bytes] = deque()
+    newlines = 0
+    with path.open("rb") as f:
+        f.seek(0, 2)
+        pos = f.tell()
+        while pos > 0 and newlines <= n:
+            step = min(8192, pos)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step)
+            newlines += chunk.count(b"\n")
+            chunks.appendleft(chunk)
+    lines = b"".join(chunks).decode("utf-8", "replace").splitlines()[-n:] if n > 0 else []
     for ln in lines:
         print(ln)
 
 
-def main() -> int:
-    ap = argparse.ArgumentParser(prog="whpg_dr_sync", description="WHPG DR Sync tool (PRIMARY publisher + DR consumer).")
-    ap.add_argument("--config", required=True, help="Path to dr_sync_config.json")
+# Subcommands of both modes, in help order. _add_primary/_add_dr build their
+# subparsers from this, so _peek_mode_cmd always knows every one of them.
+_CMDS = ("run", "stop", "pid-status", "status", "logs")
+
+_PRIMARY_HELP = {
+    "run": "Run publisher",
+    "stop": "Stop daemon (pidfile mode)",
+    "pid-status": "Show pidfile status (pidfile mode)",
+    "status": "Show PRIMARY state (LATEST manifest etc.)",
+    "logs": "Tail latest manifest/LATEST.json",
+}
+_DR_HELP = {
+    "run": "Run consumer",
+    "stop": "Stop daemon (pidfile mode)",
+    "pid-status": "Show pidfile status (pidfile mode)",
+    "status": "Show DR state (current restore point + latest receipt)",
+    "logs": "Tail receipts directory",
+}
 
-    sub = ap.add_subparsers(dest="mode", required=True)
 
-    # PRIMARY
+def _peek_mode_cmd(argv: List[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Find the <mode> <cmd> tokens without building the parser tree.
+    Returns (None, None) when --help is requested or the tokens are not
+    recognised, so the caller falls back to the full tree (and argparse
+    produces its usual help/error output).
+    """
+    if any(a in ("-h", "--help") for a in argv):
+        return None, None
+    pos: List[str] = []
+    i = 0
+    while i < len(argv) and len(pos) < 2:
+        a = argv[i]
+        if a == "--config":
+            i += 2
+            continue
+        if not a.startswith("-"):
+            pos.append(a)
+        i += 1
+    if len(pos) < 2:
+        return None, None
+    mode, cmd = pos
+    if mode not in ("primary", "dr") or cmd not in _CMDS:
+        return None, None
+    return mode, cmd
+
+
+def _add_primary(sub: Any, only: Optional[str] = None) -> None:
     p_primary = sub.add_parser("primary", help="Primary-side restore-point publisher")
     sp_primary = p_primary.add_subparsers(dest="cmd", required=True)
 
-    p_run = sp_primary.add_parser("run", help="Run publisher")
-    p_run.add_argument("--once", action="store_true")
-    p_run.add_argument("--no-gp-switch-wal", action="store_true")
-    # In PRIMARY subcommands, add:
-    sp_primary.add_parser("stop", help="Stop daemon (pidfile mode)")
-    sp_primary.add_parser("pid-status", help="Show pidfile status (pidfile mode)")
-
-    p_status = sp_primary.add_parser("status", help="Show PRIMARY state (LATEST manifest etc.)")
-    p_status.add_argument("--format", choices=["table", "prometheus", "json"], default="table")
-    p_status.add_argument("--include-history", action="store_true")
-    p_status.add_argument("--history-n", type=int, default=10)
-    p_status.add_argument("--name", default="whpg_dr_sync")
+    for name in _CMDS if only is None else (only,):
+        p = sp_primary.add_parser(name, help=_PRIMARY_HELP[name])
+        if name == "run":
+            p.add_argument("--once", action="store_true")
+            p.add_argument("--no-gp-switch-wal", action="store_true")
+        elif name == "status":
+            p.add_argument("--format", choices=["table", "prometheus", "json"], default="table")
+            p.add_argument("--include-history", action="store_true")
+            p.add_argument("--history-n", type=int, default=10)
+            p.add_argument("--name", default="whpg_dr_sync")
+        elif name == "logs":
+            p.add_argument("--n", type=int, default=50)
+
+
+def _add_dr(sub: Any, only: Optional[str] = None) -> None:
+    p_dr = sub.add_parser("dr", help="DR-side manifest consumer")
+    sp_dr = p_dr.add_subparsers(dest="cmd", required=True)
 
-    p_logs = sp_primary.add_parser("logs", help="Tail latest manifest/LATEST.json")
-    p_logs.add_argument("--n", type=int, default=50)
+    for name in _CMDS if only is None else (only,):
+        d = sp_dr.add_parser(name, help=_DR_HELP[name])
+        if name == "run":
+            d.add_argument("--once", action="store_true")
+            d.add_argument("--target", default="LATEST")
+        # Enhanced status (backward compatible)
+        elif name == "status":
+            d.add_argument("--format", choices=["table", "prometheus", "json"], default="table")
+            d.add_argument("--include-history", action="store_true", help="Include recent receipts summary")
+            d.add_argument("--history-n", type=int, default=10, help="How many receipts to scan (default: 10)")
+            d.add_argument("--name", default="whpg_dr_sync", help="Metric prefix/name for prometheus output")
+        elif name == "logs":
+            d.add_argument("--n", type=int, default=50)
 
 
-    # DR
-    p_dr = sub.add_parser("dr", help="DR-side manifest consumer")
-    sp_dr = p_dr.add_subparsers(dest="cmd", required=True)
+def main() -> int:
+    try:
+        return _main()
+    except ShutdownRequested as e:
+        print(f"[stop] {e.reason}")
+        return e.code
 
-    d_run = sp_dr.add_parser("run", help="Run consumer")
-    d_run.add_argument("--once", action="store_true")
-    d_run.add_argument("--target", default="LATEST")
 
-    sp_dr.add_parser("stop", help="Stop daemon (pidfile mode)")
-    sp_dr.add_parser("pid-status", help="Show pidfile status (pidfile mode)")
+def _main() -> int:
+    ap = argparse.ArgumentParser(prog="whpg_dr_sync", description="WHPG DR Sync tool (PRIMARY publisher + DR consumer).")
+    ap.add_argument("--config", required=True, help="Path to dr_sync_config.json")
 
-    # Enhanced status (backward compatible)
-    d_status = sp_dr.add_parser("status", help="Show DR state (current restore point + latest receipt)")
-    d_status.add_argument("--format", choices=["table", "prometheus", "json"], default="table")
-    d_status.add_argument("--include-history", action="store_true", help="Include recent receipts summary")
-    d_status.add_argument("--history-n", type=int, default=10, help="How many receipts to scan (default: 10)")
-    d_status.add_argument("--name", default="whpg_dr_sync", help="Metric prefix/name for prometheus output")
+    sub = ap.add_subparsers(dest="mode", required=True)
 
-    d_logs = sp_dr.add_parser("logs", help="Tail receipts directory")
-    d_logs.add_argument("--n", type=int, default=50)
+    # Only build the subparsers for the leaf being dispatched; --help and
+    # unrecognised input get the full tree.
+    mode, cmd = _peek_mode_cmd(sys.argv[1:])
+    if mode is None:
+        _add_primary(sub)
+        _add_dr(sub)
+    elif mode == "primary":
+        _add_primary(sub, only=cmd)
+    else:
+        _add_dr(sub, only=cmd)
 
     args = ap.parse_args()
     install_signal_handlers()
+
+    from .common import configure_psql, configure_ssh
+    from .config import load_config
+
     cfg = load_config(args.config)
+    configure_ssh(
+        cfg.state_dir if cfg.ssh_controlmaster else None,
+        idle_gap_secs=cfg.publisher_sleep_secs if args.mode == "primary" else cfg.consumer_sleep_secs,
+    )
+    configure_psql(cfg.psql_session_pool)
 
     if args.mode == "primary":
-        from .primary import publish_one
-
         if args.cmd == "stop":
             pid_stop(cfg, "primary")
             return 0
@@ -149,11 +236,13 @@ def main() -> int:
             return 0
 
         if args.cmd == "logs":
-            receipts = sorted(Path(cfg.receipts_dir).glob("*.receipt.json"))
-            if not receipts:
+            from .status import latest_receipt_name
+
+            name = latest_receipt_name(cfg.receipts_dir)
+            if name is None:
                 print("[DR] no receipts yet")
                 return 0
-            latest = receipts[-1]
+            latest = Path(cfg.receipts_dir) / name
             print(f"[DR] tailing latest receipt: {latest}")
             _tail_file(latest, n=args.n)
             return 0
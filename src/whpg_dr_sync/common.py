@@ -1,25 +1,86 @@
 from __future__ import annotations
 
+import atexit
+import ctypes
+import errno
 import json
+import mmap
 import os
+import select
+import shlex
 import signal
+import struct
 import subprocess
-from dataclasses import dataclass
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+try:  # optional: faster JSON parsing when installed (pip install whpg_dr_sync[fast])
+    import orjson
+
+    json_loads = orjson.loads  # raises orjson.JSONDecodeError, a json.JSONDecodeError
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+    json_loads = json.loads
+
+
+def json_dumps_bytes(obj: Any) -> bytes:
+    """obj as indented UTF-8 JSON plus a trailing newline (orjson if available)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(
+                obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE
+            )
+        except TypeError:  # orjson.JSONEncodeError, e.g. an int past 64 bits
+            pass
+    return (json.dumps(obj, indent=2) + "\n").encode("utf-8")
+
+
+# Files at least this big are decoded straight from an mmap of the page
+# cache; only orjson can take the mapping (the stdlib decoder wants a copy).
+_JSON_MMAP_MIN_BYTES = 64 * 1024
+
+
+def json_load_file(path: str, size: int) -> Any:
+    """
+    Decode the JSON file at path, whose size the caller already has from a
+    stat. None if the file is empty or blank; OSError and JSONDecodeError
+    propagate.
+    """
+    with open(path, "rb") as f:
+        if orjson is not None and size >= _JSON_MMAP_MIN_BYTES:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # shrank to nothing since the stat
+                mm = None
+            if mm is not None:
+                with mm, memoryview(mm) as view:
+                    return orjson.loads(view)
+        data = f.read()
+    return json_loads(data) if data.strip() else None
 
 
 # =============================
 # Graceful shutdown plumbing
 # =============================
-_STOP = False
+_STOP_EVENT = threading.Event()
+# Self-pipe written on stop so select()-based waits wake up immediately
+_STOP_PIPE_R, _STOP_PIPE_W = os.pipe()
+os.set_blocking(_STOP_PIPE_R, False)
+os.set_blocking(_STOP_PIPE_W, False)
 
 
 def _request_stop(signum: int, frame: object) -> None:
     # Called on SIGINT/SIGTERM
-    global _STOP
-    _STOP = True
+    _STOP_EVENT.set()
+    try:
+        os.write(_STOP_PIPE_W, b"\0")
+    except OSError:
+        pass
 
 
 # Register handlers once at import time
@@ -27,17 +88,27 @@ signal.signal(signal.SIGINT, _request_stop)
 signal.signal(signal.SIGTERM, _request_stop)
 
 
-@dataclass(frozen=True)
 class ShutdownRequested(RuntimeError):
-    reason: str = "shutdown requested"
-    code: int = 130  # 130 = standard exit code for Ctrl-C
+    def __init__(self, reason: str = "shutdown requested", code: int = 130) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.code = code  # 130 = standard exit code for Ctrl-C
 
 
 def check_stop() -> None:
     """
     Call this in loops / between steps to exit cleanly on Ctrl-C / SIGTERM.
     """
-    if _STOP:
+    if _STOP_EVENT.is_set():
+        raise ShutdownRequested("shutdown requested")
+
+
+def sleep_or_stop(secs: float) -> None:
+    """
+    Sleep up to secs, waking immediately (with ShutdownRequested) if a stop
+    is requested meanwhile.
+    """
+    if _STOP_EVENT.wait(timeout=max(0.0, secs)):
         raise ShutdownRequested("shutdown requested")
 
 
@@ -48,26 +119,79 @@ def utc_now_iso() -> str:
     return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
 
+# Directories atomic writes have already created (or found), so repeat
+# writes into the same state/manifest dir skip the mkdir syscalls.
+_MADE_DIRS: Set[str] = set()
+
+
+def _ensure_dir(d: Path) -> None:
+    key = str(d)
+    if key not in _MADE_DIRS:
+        d.mkdir(parents=True, exist_ok=True)
+        _MADE_DIRS.add(key)
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    """
+    Write data via tmp file + fsync + rename, then fsync the directory so the
+    rename itself survives a crash: readers see the old or the new content,
+    never a torn file.
+    """
+    _ensure_dir(path.parent)
+    tmp = str(path) + ".tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(tmp, str(path))
+    _fsync_dir(path.parent)
+
+
 def atomic_write_json(path: Path, obj: dict) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    tmp = Path(str(path) + ".tmp")
-    tmp.write_text(json.dumps(obj, indent=2) + "\n")
-    os.replace(str(tmp), str(path))
+    """atomic_write_bytes of obj encoded once as indented JSON."""
+    atomic_write_bytes(path, json_dumps_bytes(obj))
 
 
-def run(cmd: List[str], env: Optional[Dict[str, str]] = None, check: bool = True) -> str:
+def _fsync_dir(d: Path) -> None:
+    try:
+        dfd = os.open(str(d), os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return
+    try:
+        os.fsync(dfd)
+    except OSError:
+        pass
+    finally:
+        os.close(dfd)
+
+
+def run(
+    cmd: List[str],
+    env: Optional[Dict[str, str]] = None,
+    check: bool = True,
+    input: Optional[str] = None,
+    timeout: Optional[float] = None,
+) -> str:
     """
     subprocess runner that converts Ctrl-C/SIGTERM into ShutdownRequested,
-    instead of dumping a traceback.
+    instead of dumping a traceback. input, if given, is fed to stdin. With
+    timeout, a child still running after timeout seconds is killed and
+    RuntimeError (mentioning "timeout") is raised.
     """
     check_stop()
     try:
-        p = subprocess.run(cmd, text=True, capture_output=True, env=env)
+        p = subprocess.run(cmd, text=True, capture_output=True, env=env, input=input, timeout=timeout)
     except KeyboardInterrupt:
         # If SIGINT arrived while we were waiting on a child
         raise ShutdownRequested("interrupted (Ctrl-C)")
+    except subprocess.TimeoutExpired:
+        raise RuntimeError("Command failed: {}\ntimeout after {}s".format(" ".join(cmd), timeout)) from None
 
-    if _STOP:
+    if _STOP_EVENT.is_set():
         # SIGTERM/SIGINT could arrive just after subprocess returns
         raise ShutdownRequested("shutdown requested")
 
@@ -81,6 +205,219 @@ def run(cmd: List[str], env: Optional[Dict[str, str]] = None, check: bool = True
 # =============================
 # psql helpers
 # =============================
+# Environment snapshot taken once at import; per-PGOPTIONS variants are
+# built from it on first use and reused, so no call copies os.environ.
+_BASE_ENV: Dict[str, str] = dict(os.environ)
+_PG_ENVS: Dict[str, Dict[str, str]] = {}
+# Connect timeout for those variants (the DR side's utility-mode probes), so
+# a host that swallows SYNs can't hold a poll tick for the OS's TCP timeout.
+# An explicit PGCONNECT_TIMEOUT in the environment wins.
+_PG_CONNECT_TIMEOUT_SECS = "5"
+
+
+def pg_env(pgoptions: str = "") -> Optional[Dict[str, str]]:
+    """
+    env= for a libpq child: None (inherit as-is) without pgoptions, else a
+    cached copy of the base environment with PGOPTIONS (and a default
+    PGCONNECT_TIMEOUT) set. Do not mutate.
+    """
+    if not pgoptions:
+        return None
+    env = _PG_ENVS.get(pgoptions)
+    if env is None:
+        env = _PG_ENVS[pgoptions] = {
+            "PGCONNECT_TIMEOUT": _PG_CONNECT_TIMEOUT_SECS, **_BASE_ENV, "PGOPTIONS": pgoptions
+        }
+    return env
+
+
+class PsqlSession:
+    """
+    Long-lived psql process fed SQL over stdin: one fork + connection
+    handshake serves many queries. Each query is followed by an \\echo of a
+    sentinel line, and output is read up to that line.
+
+    psql runs with ON_ERROR_STOP, so a failing statement (or a lost
+    connection) makes it exit; query() then raises RuntimeError with psql's
+    stderr and the session is closed. Queries are serialized per session.
+    """
+
+    _SENTINEL = b"__whpg_dr_sync_end__"
+
+    def __init__(self, host: str, port: int, user: str, db: str, pgoptions: str = "") -> None:
+        env = pg_env(pgoptions)
+        self.cmd = [
+            "psql", "-qtAX", "-v", "ON_ERROR_STOP=1",
+            "-h", host, "-p", str(port), "-U", user, "-d", db,
+        ]
+        # stderr goes to a file, not a pipe: nobody drains it between queries
+        self._err = tempfile.TemporaryFile()
+        self._lock = threading.Lock()
+        self.p = subprocess.Popen(
+            self.cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=self._err,
+            env=env,
+        )
+
+    def alive(self) -> bool:
+        return self.p.poll() is None
+
+    def query(self, sql: str, timeout: Optional[float] = None) -> str:
+        """
+        Run sql and return its output. With timeout, a reply (including the
+        first query's connect) that takes longer kills the session and
+        raises RuntimeError mentioning "timeout", so a hung server costs
+        the caller at most timeout seconds.
+        """
+        check_stop()
+        stmt = sql.strip()
+        if not stmt.endswith(";"):
+            stmt += ";"
+        with self._lock:
+            timed_out = threading.Event()
+            timer = threading.Timer(timeout, self._kill, (timed_out,)) if timeout else None
+            if timer is not None:
+                timer.daemon = True
+                timer.start()
+            # stderr written before this query (notices, an earlier query's
+            # warnings) is not part of its error. fstat rather than seek: the
+            # file offset is shared with psql's stderr.
+            err_start = os.fstat(self._err.fileno()).st_size
+            try:
+                # Pipes are binary: lines are matched as bytes and the reply
+                # decoded once, rather than per line through a TextIOWrapper.
+                lines: List[bytes] = []
+                try:
+                    assert self.p.stdin is not None and self.p.stdout is not None
+                    self.p.stdin.write(stmt.encode() + b"\n\\echo " + self._SENTINEL + b"\n")
+                    self.p.stdin.flush()
+                    while True:
+                        ln = self.p.stdout.readline()
+                        if not ln:
+                            self._fail(sql, err_start)
+                        if ln.rstrip(b"\n") == self._SENTINEL:
+                            break
+                        lines.append(ln)
+                except BrokenPipeError:
+                    self._fail(sql, err_start)
+            except KeyboardInterrupt:
+                self.close()
+                raise ShutdownRequested("interrupted (Ctrl-C)")
+            except BaseException:
+                self.close()
+                if timed_out.is_set():
+                    raise RuntimeError(
+                        "Command failed: {} -c {}\npsql timeout after {}s".format(" ".join(self.cmd), sql, timeout)
+                    ) from None
+                raise
+            finally:
+                if timer is not None:
+                    timer.cancel()
+
+        if _STOP_EVENT.is_set():
+            raise ShutdownRequested("shutdown requested")
+        return b"".join(lines).decode("utf-8", "replace").strip()
+
+    def _kill(self, timed_out: threading.Event) -> None:
+        timed_out.set()
+        self.p.kill()
+
+    def _fail(self, sql: str, err_start: int = 0) -> None:
+        # Only the stderr written since err_start (this query's), once psql
+        # has exited and can't write any more.
+        self._send_eof()
+        self._wait()
+        self._err.seek(err_start)
+        stderr = self._err.read().decode("utf-8", "replace")
+        self._release()
+        raise RuntimeError(
+            "Command failed: {} -c {}\nSTDERR:\n{}".format(" ".join(self.cmd), sql, stderr)
+        )
+
+    def close(self) -> None:
+        self._send_eof()
+        self._reap()
+
+    def _send_eof(self) -> None:
+        # psql quits (and says goodbye to the server) on end of input
+        if self.p.poll() is None:
+            try:
+                if self.p.stdin:
+                    self.p.stdin.close()
+            except OSError:
+                pass
+
+    def _reap(self) -> None:
+        self._wait()
+        self._release()
+
+    def _wait(self) -> None:
+        try:
+            self.p.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            self.p.kill()
+            self.p.wait()
+
+    def _release(self) -> None:
+        # a respawned session must not leave its pipes and stderr file open
+        for f in (self.p.stdin, self.p.stdout, self._err):
+            try:
+                if f:
+                    f.close()
+            except OSError:
+                pass
+
+
+_PSQL_SESSIONS: Dict[Tuple[str, int, str, str, str], PsqlSession] = {}
+_PSQL_SESSIONS_LOCK = threading.Lock()
+# False: every psql() call forks a one-shot psql -c instead (see configure_psql)
+_PSQL_POOL = True
+
+
+def configure_psql(pool_sessions: bool) -> None:
+    """
+    Choose between pooled long-lived psql sessions (the default) and one
+    psql process per query, e.g. where a pooler or server limits idle
+    sessions. Closes any pooled sessions when pooling is turned off.
+    """
+    global _PSQL_POOL
+    _PSQL_POOL = bool(pool_sessions)
+    if not _PSQL_POOL:
+        close_psql_sessions()
+
+
+def _psql_session(host: str, port: int, user: str, db: str, pgoptions: str) -> PsqlSession:
+    key = (host, int(port), user, db, pgoptions)
+    with _PSQL_SESSIONS_LOCK:
+        sess = _PSQL_SESSIONS.get(key)
+        if sess is None or not sess.alive():
+            if sess is not None:
+                # after any query still failing on it has read its stderr
+                with sess._lock:
+                    sess.close()
+            sess = PsqlSession(host, port, user, db, pgoptions)
+            _PSQL_SESSIONS[key] = sess
+        return sess
+
+
+@atexit.register
+def close_psql_sessions() -> None:
+    """
+    Close every pooled session (end of a cycle, and at exit). All sessions
+    get EOF first and are reaped afterwards, so their exits overlap instead
+    of each waiting for the previous one.
+    """
+    with _PSQL_SESSIONS_LOCK:
+        sessions = list(_PSQL_SESSIONS.values())
+        _PSQL_SESSIONS.clear()
+        for sess in sessions:
+            sess._send_eof()
+        for sess in sessions:
+            sess._reap()
+
+
 def psql(
     host: str,
     port: int,
@@ -88,12 +425,17 @@ def psql(
     db: str,
     sql: str,
     pgoptions: str = "",
+    timeout: Optional[float] = None,
 ) -> str:
-    env = os.environ.copy()
-    if pgoptions:
-        env["PGOPTIONS"] = pgoptions
-    cmd = ["psql", "-qtA", "-h", host, "-p", str(port), "-U", user, "-d", db, "-c", sql]
-    return run(cmd, env=env, check=True).strip()
+    """
+    Run sql on a pooled PsqlSession for (host, port, user, db, pgoptions),
+    giving up after timeout seconds if set (see PsqlSession.query). With
+    pooling turned off (configure_psql), a one-shot psql -c runs instead.
+    """
+    if not _PSQL_POOL:
+        cmd = ["psql", "-qtAX", "-v", "ON_ERROR_STOP=1", "-h", host, "-p", str(port), "-U", user, "-d", db, "-c", sql]
+        return run(cmd, env=pg_env(pgoptions), check=True, timeout=timeout).strip()
+    return _psql_session(host, port, user, db, pgoptions).query(sql, timeout).strip()
 
 
 def psql_util(host: str, port: int, user: str, db: str, sql: str) -> str:
@@ -106,14 +448,205 @@ def psql_util(host: str, port: int, user: str, db: str, sql: str) -> str:
 # =============================
 # SSH helpers
 # =============================
+_SSH_CONTROL_DIR: Optional[str] = None
+_SSH_PERSIST_SECS = 60
+# Hosts ssh_base_args has built multiplexed argv for: the masters
+# ssh_close_masters asks to exit.
+_SSH_HOSTS: Set[str] = set()
+
+
+def configure_ssh(control_dir: Optional[str], idle_gap_secs: int = 0) -> None:
+    """
+    Enable OpenSSH connection multiplexing. The first ssh to a host opens a
+    ControlMaster socket under control_dir; later calls reuse it, so the
+    TCP + auth handshake is paid once per host rather than once per command.
+    Passing None/"" disables multiplexing.
+
+    idle_gap_secs is the longest the caller expects to go without ssh (the
+    daemon sleep between cycles); masters persist for at least twice that,
+    so a daemon reuses them across cycles instead of reconnecting each time.
+    """
+    global _SSH_CONTROL_DIR, _SSH_PERSIST_SECS
+    if control_dir:
+        Path(control_dir).mkdir(parents=True, exist_ok=True)
+    _SSH_CONTROL_DIR = control_dir or None
+    _SSH_PERSIST_SECS = max(60, 2 * int(idle_gap_secs))
+
+
+def ssh_base_args(host: str) -> List[str]:
+    """
+    argv prefix for an ssh call to host (with ControlMaster options when
+    configure_ssh() has been called).
+    """
+    if not _SSH_CONTROL_DIR:
+        return ["ssh", host]
+    _SSH_HOSTS.add(host)
+    return [
+        "ssh",
+        "-o", "ControlMaster=auto",
+        # %C is a hash of (local host, remote host, port, user): keeps the
+        # socket path short enough for AF_UNIX regardless of state_dir.
+        "-o", f"ControlPath={_SSH_CONTROL_DIR}/.ssh-%C",
+        "-o", f"ControlPersist={_SSH_PERSIST_SECS}s",
+        host,
+    ]
+
+
+def ssh_open_masters(hosts: Iterable[str]) -> None:
+    """
+    Open (or confirm) the ControlMaster for each host, in parallel, so the
+    handshakes overlap instead of landing on whichever call reaches a host
+    first. No-op without configure_ssh(); failures are left for the real
+    calls to report.
+    """
+    hosts = sorted(set(hosts))
+    if not _SSH_CONTROL_DIR or not hosts:
+        return
+
+    def _open(host: str) -> None:
+        try:
+            run(ssh_base_args(host) + ["true"], check=False)
+        except ShutdownRequested:
+            raise
+        except Exception:
+            pass
+
+    with ThreadPoolExecutor(max_workers=min(32, len(hosts))) as ex:
+        list(ex.map(_open, hosts))
+
+
+def ssh_close_masters() -> None:
+    """
+    Ask every ControlMaster this process used to exit (daemon shutdown), in
+    parallel, rather than leaving them to linger for ControlPersist. Best
+    effort: a master that is already gone is fine.
+    """
+    hosts = sorted(_SSH_HOSTS)
+    _SSH_HOSTS.clear()
+    if not _SSH_CONTROL_DIR or not hosts:
+        return
+
+    def _exit(host: str) -> None:
+        try:
+            subprocess.run(
+                # -O exit only needs the ControlPath to find the master
+                ["ssh", "-o", f"ControlPath={_SSH_CONTROL_DIR}/.ssh-%C", "-O", "exit", host],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=10,
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+
+    with ThreadPoolExecutor(max_workers=min(32, len(hosts))) as ex:
+        list(ex.map(_exit, hosts))
+
+
 def ssh_test_file(host: str, path: str) -> bool:
     """
     Fast existence check used by publisher archive readiness logic.
     """
     try:
-        run(["ssh", host, f"test -f {path}"], check=True)
+        run(ssh_base_args(host) + [f"test -f {path}"], check=True)
         return True
     except ShutdownRequested:
         raise
     except Exception:
         return False
+
+
+def ssh_test_files_batch(host: str, paths: List[str]) -> Set[str]:
+    """
+    Check many paths on one host in a single ssh round-trip.
+    Returns the subset of paths that exist (empty set if ssh fails).
+    """
+    if not paths:
+        return set()
+    script = (
+        "for p in " + " ".join(shlex.quote(p) for p in paths) + "; "
+        'do test -f "$p" && echo "OK:$p"; done; true'
+    )
+    try:
+        out = run(ssh_base_args(host) + [script], check=True)
+    except ShutdownRequested:
+        raise
+    except Exception:
+        return set()
+    return {ln[3:] for ln in out.splitlines() if ln.startswith("OK:")}
+
+
+# =============================
+# File watching (Linux inotify)
+# =============================
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_INOTIFY_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len (+ name[len])
+
+
+class _DirWatcher:
+    """
+    inotify watch on one directory for files closed-after-write or renamed
+    in. Kept open between waits so events arriving while the caller is busy
+    are queued rather than lost.
+    """
+
+    def __init__(self, path: str) -> None:
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            init1 = libc.inotify_init1
+            add_watch = libc.inotify_add_watch
+        except (OSError, AttributeError):
+            raise OSError(errno.ENOSYS, "inotify not available")
+        add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        fd = init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            e = ctypes.get_errno()
+            raise OSError(e, os.strerror(e))
+        if add_watch(fd, os.fsencode(path), _IN_CLOSE_WRITE | _IN_MOVED_TO) < 0:
+            e = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(e, f"inotify_add_watch({path}): {os.strerror(e)}")
+        self.fd = fd
+
+    def wait(self, timeout: float, suffix: str) -> Optional[str]:
+        deadline = time.monotonic() + max(0.0, timeout)
+        while True:
+            check_stop()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            ready, _, _ = select.select([self.fd, _STOP_PIPE_R], [], [], remaining)
+            if _STOP_PIPE_R in ready:
+                check_stop()
+            if self.fd not in ready:
+                continue
+            try:
+                buf = os.read(self.fd, 4096)
+            except BlockingIOError:
+                continue
+            off = 0
+            while off + _INOTIFY_EVENT.size <= len(buf):
+                _, _, _, ln = _INOTIFY_EVENT.unpack_from(buf, off)
+                off += _INOTIFY_EVENT.size
+                name = buf[off:off + ln].rstrip(b"\0").decode("utf-8", "replace")
+                off += ln
+                if name.endswith(suffix):
+                    return name
+
+
+_WATCHERS: Dict[str, _DirWatcher] = {}
+
+
+def wait_for_new_file(dir: str, timeout: float, suffix: str = ".json") -> Optional[str]:
+    """
+    Block until a file ending in suffix is written (closed) or renamed into
+    dir, or timeout seconds pass. Returns the file name, or None on timeout.
+    Raises ShutdownRequested on stop, OSError if inotify is unavailable
+    (callers fall back to plain polling).
+
+    The watch is created on first use and kept, so files that land between
+    two calls are still reported by the next one.
+    """
+    w = _WATCHERS.get(dir)
+    if w is None:
+        w = _WATCHERS[dir] = _DirWatcher(dir)
+    return w.wait(timeout, suffix)
+
@@ -1,13 +1,15 @@
 from __future__ import annotations
 
-import json
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, NamedTuple
 
+from .common import json_loads
 
-@dataclass(frozen=True)
-class Instance:
+
+class Instance(NamedTuple):
+    # NamedTuple rather than a frozen dataclass: instances are read on every
+    # poll tick from many worker threads and never mutated.
     gp_segment_id: int
     host: str
     port: int
@@ -31,6 +33,7 @@ class Config:
     latest_path: str
     manifest_fetch_command: str  # Optional custom command to fetch manifest files remotely
     manifest_list_command: str  # Optional custom command to list manifest files remotely
+    manifest_stat_command: str  # Optional cheap command printing a change token (size/mtime/ETag) for a manifest
 
     # archive (publisher uses this)
     archive_dir: str
@@ -40,6 +43,7 @@ class Config:
     state_dir: str
     receipts_dir: str
     instances: List[Instance]
+    instances_by_id: Dict[int, Instance]  # gp_segment_id -> Instance, built once at load
 
     # behavior
     publisher_sleep_secs: int
@@ -55,27 +59,34 @@ class Config:
     wal_enumerate_hard_limit: int
     wal_check_command: str  # Optional custom command to check WAL file existence (global fallback)
     wal_check_commands: Dict[int, str]  # Per-segment/coordinator custom commands (segment_id -> command)
+    wal_list_command: str  # Optional command listing the archive (one WAL name per line) for bulk checks
+
+    # ssh
+    ssh_controlmaster: bool  # Multiplex ssh calls over a per-host ControlMaster (default on)
+    ssh_parallelism: int  # Max concurrent per-instance/per-host tasks in a DR cycle (1 = serial)
+
+    # psql
+    psql_session_pool: bool  # Reuse one long-lived psql per (host, port, user, db) (default on)
 
 
 def load_config(path: str) -> Config:
     p = Path(path)
-    raw = json.loads(p.read_text())
+    raw = json_loads(p.read_bytes())
     beh = raw.get("behavior", {})
 
     def geti(k: str, default: int) -> int:
         return int(beh.get(k, default))
 
-    instances: List[Instance] = []
-    for it in raw["dr"]["instances"]:
-        instances.append(
-            Instance(
-                gp_segment_id=int(it["gp_segment_id"]),
-                host=str(it["host"]).strip(),
-                port=int(it["port"]),
-                data_dir=str(it["data_dir"]).strip(),
-                is_local=bool(it.get("is_local", False)),
-            )
+    instances: List[Instance] = [
+        Instance(
+            gp_segment_id=int(it["gp_segment_id"]),
+            host=str(it["host"]).strip(),
+            port=int(it["port"]),
+            data_dir=str(it["data_dir"]).strip(),
+            is_local=bool(it.get("is_local", False)),
         )
+        for it in raw["dr"]["instances"]
+    ]
 
     # Parse wal_check_commands (per-segment configuration)
     wal_check_commands_raw = beh.get("wal_check_commands", {})
@@ -102,6 +113,7 @@ def load_config(path: str) -> Config:
         latest_path=raw["storage"]["latest_path"],
         manifest_fetch_command=raw["storage"].get("manifest_fetch_command", ""),
         manifest_list_command=raw["storage"].get("manifest_list_command", ""),
+        manifest_stat_command=raw["storage"].get("manifest_stat_command", ""),
 
         archive_dir=raw["archive"]["archive_dir"],
 
@@ -109,6 +121,7 @@ def load_config(path: str) -> Config:
         state_dir=raw["dr"]["state_dir"],
         receipts_dir=raw["dr"]["receipts_dir"],
         instances=instances,
+        instances_by_id={it.gp_segment_id: it for it in instances},
 
         publisher_sleep_secs=geti("publisher_sleep_secs", 10),
         archive_wait_max_secs=geti("archive_wait_max_secs", 30),
@@ -122,4 +135,10 @@ def load_config(path: str) -> Config:
         wal_enumerate_hard_limit=geti("wal_enumerate_hard_limit", 250000),
         wal_check_command=beh.get("wal_check_command", ""),
         wal_check_commands=wal_check_commands,
+        wal_list_command=beh.get("wal_list_command", ""),
+
+        ssh_controlmaster=bool(beh.get("ssh_controlmaster", True)),
+        ssh_parallelism=max(1, geti("ssh_parallelism", 32)),
+
+        psql_session_pool=bool(beh.get("psql_session_pool", True)),
     )
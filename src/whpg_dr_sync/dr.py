@@ -1,63 +1,124 @@
 from __future__ import annotations
 
+import heapq
 import json
+import mmap
 import os
 import re
+import shlex
+import socket
+import struct
 import subprocess
 import sys
+import threading
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from dataclasses import dataclass
+from contextlib import nullcontext
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
-
-from .common import ShutdownRequested, atomic_write_json, check_stop, run, utc_now_iso
-from .config import Config
+from typing import Callable, ContextManager, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple, TypeVar, Union
+
+from .common import (
+    ShutdownRequested,
+    atomic_write_bytes,
+    atomic_write_json,
+    check_stop,
+    close_psql_sessions,
+    json_load_file,
+    json_loads,
+    pg_env,
+    psql,
+    run,
+    sleep_or_stop,
+    ssh_base_args,
+    ssh_close_masters,
+    ssh_open_masters,
+    utc_now_iso,
+    wait_for_new_file,
+)
+from .config import Config, Instance
 from .service import write_pid, remove_pid
 
+T = TypeVar("T")
+K = TypeVar("K")
+
+# Per-instance steps run on thread pools; serialize their log lines so two
+# workers' output never interleaves mid-line.
+_PRINT_LOCK = threading.Lock()
+
+
+def _log(msg: str) -> None:
+    with _PRINT_LOCK:
+        print(msg)
+
+
 # =============================
 # Shell helpers
 # =============================
-def sh_quote(s: str) -> str:
-    return "'" + s.replace("'", "'\"'\"'") + "'"
+# shlex.quote leaves plain paths/words unquoted, which keeps most scripts
+# free of shell metacharacters (see ssh_bash). Memoized: the same gp_home
+# and data_dir strings are quoted for every instance on every tick.
+sh_quote = lru_cache(maxsize=256)(shlex.quote)
 
-def ssh_bash(host: str, script: str, check: bool = True) -> str:
-    # Use a non-interactive, non-login shell to keep output stable
-    cmd = f"bash --noprofile --norc -lc {sh_quote(script)}"
-    return run(["ssh", host, cmd], check=check)
+_SHELL_META = frozenset(";|&$`<>(){}*?[]\\\"'~#\n")
 
-def gpssh_bash(host: str, script: str, check: bool = True) -> str:
-    cmd = f"bash --noprofile --norc -lc {sh_quote(script)}"
-    return run(["gpssh", "-h", host, "-e", cmd], check=check)
 
-def _preflight(inst: DrInstance, gp_home: str) -> None:
-    if inst.gp_segment_id == -1:
-        return
-    cmd = (
-        f"set -euo pipefail; "
-        f"test -f {sh_quote(gp_home)}/greenplum_path.sh; "
-        f"source {sh_quote(gp_home)}/greenplum_path.sh; "
-        f"which pg_ctl; "
-        f"test -d {sh_quote(inst.data_dir)}; "
-        f"echo OK host=$(hostname) datadir={sh_quote(inst.data_dir)}"
-    )
-    out = ssh_bash(inst.host, cmd, check=False)
-    print(f"[DR][seg={inst.gp_segment_id}] preflight: {out}")
+def _has_shell_meta(s: str) -> bool:
+    return not _SHELL_META.isdisjoint(s)
 
-def rewrite_conf_kv(conf_path: str, key: str, value_line: str) -> str:
-    k = sh_quote(key)
-    v = sh_quote(value_line)
+
+def ssh_bash(host: str, script: str, check: bool = True) -> str:
+    # Scripts go to the remote bash on stdin, so they need no extra quoting
+    # layer and aren't bounded by the remote command-line length. The { }
+    # group is parsed whole before it runs, and its commands get /dev/null
+    # rather than the rest of the script as stdin.
+    if not _has_shell_meta(script):
+        return run(ssh_base_args(host) + [script], check=check)
+    return run(ssh_base_args(host) + ["bash --noprofile --norc -s"], check=check,
+               input="{\n" + script + "\n} </dev/null\n")
+
+
+# One pass over the conf: each line is kept in memory with the index of
+# the key it sets (0 if none), counting per key the lines rewrite_conf_lines
+# would match and whether they differ from the wanted line. END then prints
+# the lines of keys that don't need rewriting and appends the new lines in
+# edit order. Keys/values arrive via ENVIRON so awk doesn't interpret
+# backslashes in them.
+_CONF_KVS_AWK = (
+    "function key_of(line,  i) { for (i = 1; i <= n; i++) "
+    "if (line ~ (\"^[[:space:]]*#?[[:space:]]*\" k[i] \"[[:space:]]*=\")) return i; return 0 } "
+    "BEGIN { n = ENVIRON[\"WHPG_N\"] + 0; "
+    "for (i = 1; i <= n; i++) { k[i] = ENVIRON[\"WHPG_K\" i]; v[i] = ENVIRON[\"WHPG_V\" i] } } "
+    "{ line[NR] = $0; i = key[NR] = key_of($0); if (i) { hits[i]++; if ($0 != v[i]) diff[i] = 1 } } "
+    "END { for (j = 1; j <= NR; j++) { i = key[j]; if (!i || (hits[i] == 1 && !diff[i])) print line[j] } "
+    "for (i = 1; i <= n; i++) if (hits[i] != 1 || diff[i]) print v[i] }"
+)
+
+
+def rewrite_conf_kvs(conf_path: str, edits: List[Tuple[str, str]], tag: str = "") -> str:
+    """
+    Shell script applying rewrite_conf_lines(conf, edits) in place with one
+    single-pass awk run: the result goes to a temp file that replaces the
+    conf (mv) only if it differs. Prints "<tag>CHANGED" or "<tag>UNCHANGED".
+    """
+    env = [f"WHPG_N={len(edits)}"]
+    for i, (key, value_line) in enumerate(edits, 1):
+        env.append(f"WHPG_K{i}={sh_quote(key)} WHPG_V{i}={sh_quote(value_line)}")
     c = sh_quote(conf_path)
     tmp = sh_quote(conf_path + ".tmp")
+    t = sh_quote(tag)
     return (
-        f"set -euo pipefail; "
-        f"conf={c}; tmp={tmp}; "
-        f"awk -v k={k} '!($0 ~ \"^[[:space:]]*#?[[:space:]]*\" k \"[[:space:]]*=\") {{print}}' \"$conf\" > \"$tmp\"; "
-        f"printf '%s\\n' {v} >> \"$tmp\"; "
-        f"mv -f \"$tmp\" \"$conf\""
+        f"{' '.join(env)} awk {sh_quote(_CONF_KVS_AWK)} {c} > {tmp} && "
+        f"if cmp -s {tmp} {c}; then rm -f {tmp}; echo {t}UNCHANGED; "
+        f"else mv -f {tmp} {c}; echo {t}CHANGED; fi"
     )
 
 
+def rewrite_conf_kv(conf_path: str, key: str, value_line: str) -> str:
+    return "set -euo pipefail; " + rewrite_conf_kvs(conf_path, [(key, value_line)])
+
+
 # =============================
 # SQL helpers (utility mode)
 # =============================
@@ -65,30 +126,119 @@ class PsqlConnError(RuntimeError):
     pass
 
 
+_UTILITY_PGOPTIONS = "-c gp_session_role=utility"
+_CONN_ERROR_MARKERS = ("could not connect to server", "Connection refused", "timeout")
+# A pooled session whose server restarted/shut down fails with one of these;
+# it is retried once on a fresh connection.
+_SESSION_LOST_MARKERS = ("server closed the connection", "terminating connection", "no connection to the server")
+
+
 def psql_util(host: str, port: int, user: str, db: str, sql: str) -> str:
-    env = os.environ.copy()
-    env["PGOPTIONS"] = "-c gp_session_role=utility"
+    env = pg_env(_UTILITY_PGOPTIONS)
     p = subprocess.run(
         ["psql", "-qtA", "-h", host, "-p", str(port), "-U", user, "-d", db, "-c", sql],
-        text=True,
         capture_output=True,
         env=env,
     )
+    # Captured as bytes; stderr is only decoded when it is reported.
+    out = p.stdout.decode("utf-8", "replace").strip()
     if p.returncode != 0:
-        stderr = (p.stderr or "").strip()
-        if ("could not connect to server" in stderr) or ("Connection refused" in stderr) or ("timeout" in stderr):
+        stderr = p.stderr.decode("utf-8", "replace").strip()
+        if any(m in stderr for m in _CONN_ERROR_MARKERS):
             raise PsqlConnError(stderr)
         raise RuntimeError(
             "Command failed: psql -qtA -h {} -p {} -U {} -d {} -c {}\nSTDOUT:\n{}\nSTDERR:\n{}".format(
-                host, port, user, db, sql, (p.stdout or "").strip(), stderr
+                host, port, user, db, sql, out, stderr
             )
         )
-    return (p.stdout or "").strip()
+    return out
+
+
+# pg_ping outcomes, as libpq's PQping reports them
+PING_OK = "ok"  # the server answered the startup packet (even with an auth error)
+PING_REJECT = "reject"  # up but not accepting connections (starting up / shutting down)
+PING_NO_RESPONSE = "no_response"  # nothing listening, or no answer in time
 
+_PG_PROTOCOL_V3 = 196608
+_PG_TERMINATE = b"X\x00\x00\x00\x04"
 
-def try_sql(host: str, port: int, user: str, db: str, sql: str) -> Tuple[bool, Optional[str], Optional[str]]:
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = b""
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            break
+        buf += chunk
+    return buf
+
+
+def pg_ping(host: str, port: int, user: str, db: str, timeout_secs: float = 3.0) -> str:
+    """
+    Liveness probe in the spirit of PQping / pg_isready, from this process
+    with no fork: TCP connect, one utility-mode startup packet, and a look at
+    the first reply. No password is ever sent. An authentication request, or
+    any error other than SQLSTATE 57P03 (cannot_connect_now), means a session
+    would be accepted; 57P03 means the postmaster is up but starting up or
+    shutting down, so a psql session can't be had yet. The port closing is
+    exactly what the wait loop is waiting for when an instance shuts down at
+    its target.
+    """
+    check_stop()
+    params = b"".join(
+        k.encode() + b"\0" + v.encode() + b"\0"
+        for k, v in (("user", user), ("database", db), ("options", _UTILITY_PGOPTIONS))
+    ) + b"\0"
+    try:
+        with socket.create_connection((host, port), timeout=timeout_secs) as sock:
+            sock.sendall(struct.pack("!ii", 8 + len(params), _PG_PROTOCOL_V3) + params)
+            head = _recv_exact(sock, 5)
+            if len(head) < 5:
+                return PING_NO_RESPONSE
+            tag, length = head[:1], struct.unpack("!i", head[1:])[0]
+            if tag == b"R":
+                # AuthenticationOk (trust) started a backend: end it cleanly
+                if _recv_exact(sock, 4) == b"\x00\x00\x00\x00":
+                    sock.sendall(_PG_TERMINATE)
+                return PING_OK
+            if tag == b"E":
+                body = _recv_exact(sock, min(max(length - 4, 0), 8192))
+                if b"\0C57P03\0" in b"\0" + body:
+                    return PING_REJECT
+            return PING_OK
+    except OSError:
+        return PING_NO_RESPONSE
+
+
+def psql_util_session(
+    host: str, port: int, user: str, db: str, sql: str, timeout: Optional[float] = None
+) -> str:
+    """
+    psql_util on a pooled long-lived utility-mode session (common.psql), so
+    the wait loop's repeated polls don't fork psql and reconnect every tick.
+    Same errors as psql_util: PsqlConnError when the instance can't be
+    reached (or doesn't answer within timeout, if set), RuntimeError otherwise.
+    """
+    for attempt in (0, 1):
+        try:
+            return psql(host, port, user, db, sql, pgoptions=_UTILITY_PGOPTIONS, timeout=timeout)
+        except ShutdownRequested:
+            raise
+        except RuntimeError as e:
+            msg = str(e)
+            if attempt == 0 and any(m in msg for m in _SESSION_LOST_MARKERS):
+                continue  # stale session from before a restart; reconnect
+            if any(m in msg for m in _CONN_ERROR_MARKERS + _SESSION_LOST_MARKERS):
+                raise PsqlConnError(msg) from None
+            raise
+    raise AssertionError("unreachable")
+
+
+def try_sql(
+    host: str, port: int, user: str, db: str, sql: str, timeout: Optional[float] = None
+) -> Tuple[bool, Optional[str], Optional[str]]:
     try:
-        return True, psql_util(host, port, user, db, sql).strip(), None
+        return True, psql_util_session(host, port, user, db, sql, timeout).strip(), None
     except PsqlConnError as e:
         return False, None, str(e)
 
@@ -97,54 +247,238 @@ def try_sql(host: str, port: int, user: str, db: str, sql: str) -> Tuple[bool, O
 # LSN compare
 # =============================
 
-def _pg_controldata_min_recovery_end_lsn(inst: DrInstance, gp_home: str) -> Optional[str]:
-    """
-    Reads 'Minimum recovery ending location' from pg_controldata.
-    Works even when the postmaster is down.
-    """
-    pgcd = f"{gp_home}/bin/pg_controldata"
-    cmd = f"{pgcd} {sh_quote(inst.data_dir)}"
-    out = run(["bash", "-lc", cmd], check=False) if inst.is_local else gpssh_bash(inst.host, cmd, check=False)
-    if not out:
-        return None
-    m = re.search(r"Minimum recovery ending location:\s+([0-9A-Fa-f]+/[0-9A-Fa-f]+)", out)
-    return m.group(1).strip() if m else None
+# pg_controldata LSN fields, compiled once (read per instance per poll
+# tick) as a single alternation so the output is scanned once for all three
+_CTL_LSN_RE = re.compile(
+    r"(Minimum recovery ending|Latest checkpoint|Latest redo) location:\s+([0-9A-Fa-f]+/[0-9A-Fa-f]+)", re.ASCII
+)
+_CTL_LSN_KEYS = {
+    "Minimum recovery ending": "min_recovery_end_lsn",
+    "Latest checkpoint": "latest_checkpoint_lsn",
+    "Latest redo": "latest_redo_lsn",
+}
+_CTL_WAL_SEG_BYTES_RE = re.compile(r"Bytes per WAL segment:\s+(\d+)", re.ASCII)
+_CTL_TIMELINE_RE = re.compile(r"Latest checkpoint's TimeLineID:\s+(\d+)", re.ASCII)
+_HISTORY_FILE_RE = re.compile(r"/([0-9A-Fa-f]{8})\.history", re.ASCII)
 
-def controldata_lsns(inst: DrInstance, gp_home: str) -> Dict[str, str]:
+
+# Lines of pg_controldata output the parsers above read: remote runs are
+# filtered on the far side so ~5 lines cross ssh instead of ~50
+_CTL_LSN_LINES = r"^(Minimum recovery ending|Latest checkpoint|Latest redo) location:"
+_CTL_FULL_LINES = r"^((Minimum recovery ending|Latest checkpoint|Latest redo) location|Bytes per WAL segment|Latest checkpoint's TimeLineID):"
+
+
+def _run_pg_controldata(inst: DrInstance, gp_home: str, lines_re: str = _CTL_LSN_LINES) -> str:
     pgcd = f"{gp_home}/bin/pg_controldata"
-    cmd = f"{pgcd} {sh_quote(inst.data_dir)}"
-    out = run(["bash", "-lc", cmd], check=False) if inst.is_local else gpssh_bash(inst.host, cmd, check=False)
-    if not out:
-        return {}
+    if inst.is_local:
+        # no shell needed locally: exec pg_controldata directly (the output
+        # is only ever parsed with the patterns above, so no filter needed)
+        try:
+            return run([pgcd, inst.data_dir], check=False)
+        except OSError:
+            return ""
+    # ssh_bash runs no login shell, so the gp environment comes from
+    # greenplum_path.sh (as for pg_ctl), not the remote profile
+    gpp = f"{sh_quote(gp_home)}/greenplum_path.sh"
+    return ssh_bash(
+        inst.host,
+        f"source {gpp} && {sh_quote(pgcd)} {sh_quote(inst.data_dir)} | grep -E {sh_quote(lines_re)}",
+        check=False,
+    )
+
 
-    fields = {
-        "min_recovery_end_lsn": r"Minimum recovery ending location:\s+([0-9A-Fa-f]+/[0-9A-Fa-f]+)",
-        "latest_checkpoint_lsn": r"Latest checkpoint location:\s+([0-9A-Fa-f]+/[0-9A-Fa-f]+)",
-        "latest_redo_lsn": r"Latest redo location:\s+([0-9A-Fa-f]+/[0-9A-Fa-f]+)",
-    }
+def _parse_controldata_lsns(out: str) -> Dict[str, str]:
     res: Dict[str, str] = {}
-    for k, pat in fields.items():
-        m = re.search(pat, out)
-        if m:
-            res[k] = m.group(1).strip()
+    for m in _CTL_LSN_RE.finditer(out):
+        # first occurrence wins, as with a per-field search
+        res.setdefault(_CTL_LSN_KEYS[m.group(1)], m.group(2))
     return res
 
-def controldata_reached_target(inst: DrInstance, gp_home: str, target_lsn: str) -> Tuple[bool, Dict[str, str]]:
+
+def controldata_lsns(inst: DrInstance, gp_home: str) -> Dict[str, str]:
+    out = _run_pg_controldata(inst, gp_home)
+    return _parse_controldata_lsns(out) if out else {}
+
+
+def controldata_full(
+    inst: DrInstance, gp_home: str
+) -> Tuple[Dict[str, str], Optional[Tuple[Optional[int], Optional[int]]]]:
+    """
+    One pg_controldata run parsed for both the LSNs and the WAL segment
+    info: (lsns, (wal_seg_size_bytes, timeline_id)). The second element is
+    None if pg_controldata printed nothing; either field is None if absent.
+
+    The LSNs also seed _CTL_CACHE under pg_control's stamp (read in the same
+    ssh call for a remote instance), so the cycle's later
+    controldata_lsns_cached reads of an unchanged instance reuse them.
+    """
+    if inst.is_local:
+        stamp = _pg_control_stamp(inst)
+        out = _run_pg_controldata(inst, gp_home, _CTL_FULL_LINES)
+    else:
+        pgcd = sh_quote(f"{gp_home}/bin/pg_controldata")
+        gpp = f"{sh_quote(gp_home)}/greenplum_path.sh"
+        ctl = sh_quote(f"{inst.data_dir}/global/pg_control")
+        raw = ssh_bash(
+            inst.host,
+            f"echo \"@@$(stat -c '%y %s' -- {ctl} 2>/dev/null)\"\n"
+            f"source {gpp} && {pgcd} {sh_quote(inst.data_dir)} | grep -E {sh_quote(_CTL_FULL_LINES)}",
+            check=False,
+        )
+        first, _, out = raw.partition("\n")
+        stamp = first[2:] if first.startswith("@@") else None
+    if not out:
+        return {}, None
+    lsns = _parse_controldata_lsns(out)
+    if stamp and lsns:
+        _CTL_CACHE[(inst.host, inst.data_dir)] = (stamp, lsns)
+    m = _CTL_WAL_SEG_BYTES_RE.search(out)
+    t = _CTL_TIMELINE_RE.search(out)
+    return lsns, (int(m.group(1)) if m else None, int(t.group(1)) if t else None)
+
+# controldata_lsns results keyed by (host, data_dir), valid while
+# global/pg_control's mtime/size stamp is unchanged. A down instance that
+# hasn't reached target doesn't touch pg_control, so repeat ticks cost a
+# stat (local: no fork at all) instead of an ssh + pg_controldata.
+_CTL_CACHE: Dict[Tuple[str, str], Tuple[str, Dict[str, str]]] = {}
+
+
+# Remote stamps fetched ahead by prefetch_controldata, one ssh call per
+# host for all of its instances; each is used once, by the next
+# _pg_control_stamp for that instance. Replaced wholesale on every prefetch,
+# so a stamp never outlives the tick it was read for.
+_CTL_STAMPS: Dict[Tuple[str, str], str] = {}
+
+
+def prefetch_controldata(
+    instances: Dict[int, DrInstance], gp_home: str, pool: Optional[ThreadPoolExecutor] = None
+) -> None:
+    """
+    Stat pg_control for every remote instance given, in one ssh call per
+    host, running (filtered) pg_controldata in the same call only where the
+    stamp differs from the cached one. The controldata_lsns_cached calls that
+    follow then cost no ssh at all for these instances.
+    """
+    _, by_host = _split_by_host(instances, group_coordinator=True)
+    pgcd = sh_quote(f"{gp_home}/bin/pg_controldata")
+    gpp = f"{sh_quote(gp_home)}/greenplum_path.sh"
+
+    def fetch(host: str, insts: List[DrInstance]) -> List[Tuple[Tuple[str, str], str, str]]:
+        # same stamp format as _pg_control_stamp; "@@<n>|<stamp>" heads
+        # instance n's section, followed by its controldata lines if re-read.
+        # greenplum_path.sh is sourced once for all of them.
+        parts = [f"source {gpp} >/dev/null 2>&1"]
+        for n, i in enumerate(insts):
+            hit = _CTL_CACHE.get((host, i.data_dir))
+            dd = sh_quote(i.data_dir)
+            parts.append(
+                f"s=$(stat -c '%y %s' -- {sh_quote(i.data_dir + '/global/pg_control')} 2>/dev/null); "
+                f"echo \"@@{n}|$s\"; "
+                f"if [ -n \"$s\" ] && [ \"$s\" != {sh_quote(hit[0] if hit else '')} ]; then "
+                f"{pgcd} {dd} 2>/dev/null | grep -E {sh_quote(_CTL_LSN_LINES)}; fi"
+            )
+        out = ssh_bash(host, "\n".join(parts), check=False)
+        stamps: Dict[int, str] = {}
+        lines: Dict[int, List[str]] = {}
+        cur = -1
+        for line in out.splitlines():
+            if line.startswith("@@"):
+                n_s, _, stamp = line[2:].partition("|")
+                cur = int(n_s) if n_s.isdigit() and int(n_s) < len(insts) else -1
+                if cur >= 0 and stamp:
+                    stamps[cur] = stamp
+            elif cur >= 0:
+                lines.setdefault(cur, []).append(line)
+        return [
+            ((host, insts[n].data_dir), stamp, "\n".join(lines.get(n, ())))
+            for n, stamp in stamps.items()
+        ]
+
+    stamps: Dict[Tuple[str, str], str] = {}
+    if by_host:
+        with _pool_or_new(pool, len(by_host)) as ex:
+            for res in ex.map(lambda kv: fetch(*kv), by_host.items()):
+                for key, stamp, out in res:
+                    stamps[key] = stamp
+                    lsns = _parse_controldata_lsns(out) if out else {}
+                    if lsns:
+                        _CTL_CACHE[key] = (stamp, lsns)
+    _CTL_STAMPS.clear()
+    _CTL_STAMPS.update(stamps)
+
+
+def _pg_control_stamp(inst: DrInstance) -> Optional[str]:
+    path = f"{inst.data_dir}/global/pg_control"
+    if inst.is_local:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return f"{st.st_mtime_ns} {st.st_size}"
+    pre = _CTL_STAMPS.pop((inst.host, inst.data_dir), None)
+    if pre:
+        return pre
+    # %y carries sub-second precision, so a rewrite within the same second
+    # still changes the stamp
+    out = ssh_bash(inst.host, f"stat -c '%y %s' -- {sh_quote(path)}", check=False)
+    return out.strip() or None
+
+
+def controldata_lsns_cached(inst: DrInstance, gp_home: str) -> Dict[str, str]:
+    """controldata_lsns, reusing the last result while pg_control is unchanged."""
+    key = (inst.host, inst.data_dir)
+    stamp = _pg_control_stamp(inst)
+    hit = _CTL_CACHE.get(key)
+    if stamp and hit and hit[0] == stamp:
+        return hit[1]
     lsns = controldata_lsns(inst, gp_home)
-    for _, v in lsns.items():
-        if lsn_ge(v, target_lsn):
-            return True, lsns
-    return False, lsns
+    if stamp and lsns:
+        _CTL_CACHE[key] = (stamp, lsns)
+    return lsns
+
+
+def _pg_controldata_min_recovery_end_lsn(inst: DrInstance, gp_home: str) -> Optional[str]:
+    """
+    Reads 'Minimum recovery ending location' from pg_controldata.
+    Works even when the postmaster is down.
+    """
+    return controldata_lsns_cached(inst, gp_home).get("min_recovery_end_lsn")
+
+
+def controldata_reached_target(
+    inst: DrInstance, gp_home: str, target_lsn: Union[str, Lsn]
+) -> Tuple[bool, Dict[str, str]]:
+    # Shares controldata_lsns_cached with _pg_controldata_min_recovery_end_lsn:
+    # asking for the floor and then the full check costs one pg_controldata.
+    lsns = controldata_lsns_cached(inst, gp_home)
+    tgt = Lsn.parse(target_lsn).val
+    return any(lsn_ge_int(v, tgt) for v in lsns.values()), lsns
 
 
 def lsn_to_int(lsn: str) -> int:
-    s = (lsn or "").strip()
+    # Empty/zero LSNs (unset fields, "no WAL needed") answer without a cache
+    # lookup and never take a cache slot.
+    if not lsn or lsn == "0/0":
+        return 0
+    return _lsn_to_int_cached(lsn)
+
+
+@lru_cache(maxsize=4096)
+def _lsn_to_int_cached(lsn: str) -> int:
+    # Cached: the same target/controldata LSNs are compared on every poll
+    # tick; sized so per-tick replay LSNs don't evict them.
+    s = lsn.strip()
     if not s or s == "0/0":
         return 0
-    if "/" not in s:
+    i = s.find("/")
+    lo = s[i + 1:]
+    if i <= 0 or not lo or len(lo) > 8:
         raise ValueError(f"Invalid pg_lsn: {lsn}")
-    x, y = s.split("/", 1)
-    return (int(x, 16) << 32) + int(y, 16)
+    # pg_lsn prints the low word unpadded (%X/%X), so pad it to 8 hex digits
+    # and parse both halves with a single int() call. (Padding both halves
+    # for bytes.fromhex + int.from_bytes measures no faster, and accepts
+    # a high word longer than 8 digits only by accident.)
+    return int(s[:i] + lo.rjust(8, "0"), 16)
 
 
 def lsn_ge(a: str, b: str) -> bool:
@@ -154,105 +488,167 @@ def lsn_ge(a: str, b: str) -> bool:
         return False
 
 
+def lsn_ge_int(a: str, b: int) -> bool:
+    # For hot comparisons against a target parsed once up front.
+    try:
+        return lsn_to_int(a) >= b
+    except ValueError:
+        return False
+
+
+class Lsn(NamedTuple):
+    """A pg_lsn parsed once: raw text for logs/receipts, val for comparisons."""
+    raw: str
+    val: int
+
+    @classmethod
+    def parse(cls, lsn: Union[str, "Lsn"]) -> "Lsn":
+        # Already-parsed values pass through, so callers can take either.
+        if isinstance(lsn, Lsn):
+            return lsn
+        s = (lsn or "").strip()
+        return cls(s, lsn_to_int(s))
+
+
 # =============================
 # Instance model
 # =============================
-@dataclass(frozen=True)
-class DrInstance:
-    gp_segment_id: int
-    host: str
-    port: int
-    data_dir: str
-    is_local: bool
+# Same shape as config.Instance; kept as an alias for existing callers.
+DrInstance = Instance
 
 
 def load_instances(cfg: Config) -> Dict[int, DrInstance]:
-    m: Dict[int, DrInstance] = {}
-    for it in cfg.instances:
-        inst = DrInstance(
-            gp_segment_id=int(it.gp_segment_id),
-            host=str(it.host).strip(),
-            port=int(it.port),
-            data_dir=str(it.data_dir).strip(),
-            is_local=bool(it.is_local),
-        )
-        m[inst.gp_segment_id] = inst
-    return m
+    # Built once in load_config; callers must not mutate it.
+    return cfg.instances_by_id
 
 
 # =============================
 # Config edits (NO sed)
 # =============================
-def clear_recovery_targets(inst: DrInstance) -> None:
+_RECOVERY_TARGET_KEYS = [
+    "recovery_target",
+    "recovery_target_name",
+    "recovery_target_lsn",
+    "recovery_target_time",
+    "recovery_target_xid",
+]
+
+
+@lru_cache(maxsize=64)
+def _conf_keys_re(keys: Tuple[str, ...]) -> re.Pattern:
+    # Same match as _CONF_KVS_AWK's key_of: active or commented-out "key =",
+    # for any of keys at once (group 1 is the key)
+    return re.compile(r"^\s*#?\s*(" + "|".join(map(re.escape, keys)) + r")\s*=", re.ASCII)
+
+
+def rewrite_conf_lines(lines: List[str], edits: List[Tuple[str, str]]) -> List[str]:
+    """
+    Python equivalent of rewrite_conf_kv applied for each (key, value_line)
+    in order: drop every line for the key and append value_line. A key whose
+    only line already equals value_line is left where it is, so re-applying
+    the same edits returns the input unchanged.
+
+    Like _CONF_KVS_AWK, this takes two passes over lines for all keys
+    together rather than two per key.
+    """
+    if not edits:
+        return lines
+    wanted = dict(edits)
+    pat = _conf_keys_re(tuple(wanted))
+    matched = [(ln, m.group(1) if m else None) for ln in lines for m in (pat.match(ln),)]
+    hits: Dict[str, List[str]] = {}
+    for ln, key in matched:
+        if key is not None:
+            hits.setdefault(key, []).append(ln)
+    redo = {k for k, v in wanted.items() if hits.get(k) != [v]}
+    if not redo:
+        return lines
+    out = [ln for ln, key in matched if key not in redo]
+    out.extend(v for k, v in edits if k in redo)
+    return out
+
+
+def edit_conf(inst: DrInstance, edits: List[Tuple[str, str]]) -> bool:
+    """
+    Apply rewrite_conf_lines to the instance's postgresql.conf, writing it
+    (atomically: temp file + fsync + rename) only if something changed. Local
+    instances are edited in Python; remote ones with one ssh call running
+    rewrite_conf_kvs. Returns True if the file was rewritten.
+    """
     check_stop()
     conf = f"{inst.data_dir}/postgresql.conf"
-    keys = [
-        "recovery_target",
-        "recovery_target_name",
-        "recovery_target_lsn",
-        "recovery_target_time",
-        "recovery_target_xid",
-    ]
-    for k in keys:
-        script = rewrite_conf_kv(conf, k, f"# {k} = ''")
-        if inst.is_local:
-            run(["bash", "-lc", script], check=True)
-        else:
-            run(["ssh", inst.host, "bash", "--noprofile", "--norc", "-lc", script], check=True)
+    if not inst.is_local:
+        out = ssh_bash(inst.host, "set -euo pipefail; " + rewrite_conf_kvs(conf, edits), check=True)
+        return out.strip() == "CHANGED"
+
+    # Lines as awk sees them: split on "\n" only (a CR, form feed etc. stays
+    # part of the line), each written back followed by "\n", and rewritten
+    # only if the bytes differ, so both paths leave the same file behind.
+    # surrogateescape round-trips bytes that aren't valid UTF-8.
+    data = Path(conf).read_bytes()
+    old = data.decode("utf-8", "surrogateescape").split("\n")
+    if old[-1] == "":
+        old.pop()
+    new = rewrite_conf_lines(old, edits)
+    out = "".join(ln + "\n" for ln in new).encode("utf-8", "surrogateescape")
+    if out == data:
+        return False
+    # no subprocess at all locally; the shared writer also fsyncs the file
+    # and the rename, so a crash can't leave a torn or vanished conf
+    atomic_write_bytes(Path(conf), out)
+    return True
+
+
+def clear_recovery_targets(inst: DrInstance) -> None:
+    edit_conf(inst, [(k, f"# {k} = ''") for k in _RECOVERY_TARGET_KEYS])
+
 
 def ensure_standby_signal(inst: DrInstance) -> None:
     check_stop()
     sig = f"{inst.data_dir}/standby.signal"
-    cmd = f"test -f {sh_quote(sig)} || touch {sh_quote(sig)}"
     if inst.is_local:
-        run(["bash", "-lc", cmd], check=True)
+        if not os.path.isfile(sig):
+            Path(sig).touch()
     else:
-        gpssh_bash(inst.host, cmd, check=True)
+        # touch on an existing (empty) standby.signal only bumps its mtime
+        run(ssh_base_args(inst.host) + [shlex.join(["touch", "--", sig])], check=True)
 
 
 def set_recovery_target_action_shutdown(inst: DrInstance) -> None:
-    check_stop()
-    conf = f"{inst.data_dir}/postgresql.conf"
-    script = rewrite_conf_kv(conf, "recovery_target_action", "recovery_target_action = 'shutdown'")
-    if inst.is_local:
-        run(["bash", "-lc", script], check=True)
-    else:
-        gpssh_bash(inst.host, script, check=True)
+    edit_conf(inst, [("recovery_target_action", "recovery_target_action = 'shutdown'")])
+
+
+def _recovery_target_edits(target_key: str, value: str) -> List[Tuple[str, str]]:
+    """
+    Edits setting target_key to value and commenting out every other
+    recovery_target_* key (the server refuses to start with more than one
+    set), for a single rewrite pass.
+    """
+    v = (value or "").strip().replace("\r", "")
+    edits = [(k, f"# {k} = ''") for k in _RECOVERY_TARGET_KEYS if k != target_key]
+    edits.append((target_key, f"{target_key} = '{v}'"))
+    return edits
 
 
 def set_recovery_target_name(inst: DrInstance, target_rp: str) -> None:
-    check_stop()
-    conf = f"{inst.data_dir}/postgresql.conf"
-    rp = (target_rp or "").strip().replace("\r", "")
-    script = rewrite_conf_kv(conf, "recovery_target_name", f"recovery_target_name = '{rp}'")
-    if inst.is_local:
-        run(["bash", "-lc", script], check=True)
-    else:
-        run(["ssh", inst.host, "bash", "--noprofile", "--norc", "-lc", script], check=True)
+    edit_conf(inst, _recovery_target_edits("recovery_target_name", target_rp))
+
 
 def set_recovery_target_lsn(inst: DrInstance, target_lsn: str) -> None:
-    check_stop()
-    conf = f"{inst.data_dir}/postgresql.conf"
-    lsn = (target_lsn or "").strip().replace("\r", "")
-    script = rewrite_conf_kv(conf, "recovery_target_lsn", f"recovery_target_lsn = '{lsn}'")
-    if inst.is_local:
-        run(["bash", "-lc", script], check=True)
-    else:
-        gpssh_bash(inst.host, script, check=True)
+    edit_conf(inst, _recovery_target_edits("recovery_target_lsn", target_lsn))
 
-def _extract_first_csv_path(text: str) -> Optional[str]:
-    # gpssh output often includes: "[host] /path/to/gpdb-....csv"
-    m = re.search(r"(/[^ \n\t]+\.csv)\b", text or "")
-    return m.group(1) if m else None
 
 def newest_log_csv(inst: DrInstance) -> Optional[str]:
+    if inst.is_local:
+        newest = _local_recent_csvs(f"{inst.data_dir}/log", 1)
+        return newest[0] if newest else None
     logdir = f"{inst.data_dir}/log"
     script = (
         "set -euo pipefail; "
         f"ls -1t {sh_quote(logdir)}/*.csv 2>/dev/null | head -n 1 || true"
     )
 
-    out = run(["bash", "-lc", script], check=False) if inst.is_local else ssh_bash(inst.host, script, check=False)
+    out = ssh_bash(inst.host, script, check=False)
     p = (out or "").strip()
     return p or None
 
@@ -273,39 +669,86 @@ def newest_log_csv(inst: DrInstance) -> Optional[str]:
 
 
 
+def _mmap_tail(path: str, n: int) -> bytes:
+    """
+    Last n lines of a local file, found by walking newlines backwards over an
+    mmap of it: only the pages of the tail are touched, nothing is forked.
+    Returns b"" for a missing or empty file.
+    """
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0 or n <= 0:
+                return b""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # like tail(1), a trailing newline doesn't start an extra line
+                end = size - 1 if mm[size - 1:size] == b"\n" else size
+                i = end
+                for _ in range(n):
+                    i = mm.rfind(b"\n", 0, i)
+                    if i < 0:
+                        break
+                return mm[i + 1:size]
+    except (FileNotFoundError, IsADirectoryError):
+        return b""
+
+
 def tail_text_file(inst: DrInstance, path: str, n: int = 200) -> str:
     """
     Tail last N lines of a file (local or remote). Returns text (may be empty).
     """
+    if inst.is_local:
+        return _mmap_tail(path, int(n)).decode("utf-8", "replace").strip()
     script = f"set -euo pipefail; test -f {sh_quote(path)} || exit 0; tail -n {int(n)} {sh_quote(path)}"
-    return run(["bash", "-lc", script], check=False) if inst.is_local else ssh_bash(inst.host, script, check=False)
+    return ssh_bash(inst.host, script, check=False)
 
 
-def parse_latest_recovery_stop_restore_point(log_text: str) -> Optional[str]:
+# Works for CSV log lines too (quoted fields). Example snippet:
+# ...,"LOG","00000","recovery stopping at restore point ""sync_point_..."" ...
+_STOP_RP_MARKER = "recovery stopping at restore point"
+_STOP_RP_RE = re.compile(_STOP_RP_MARKER + r'\s+""?([^",\r\n]+)""?', re.ASCII)
+# bytes twins, for scanning mmap'd log tails without decoding them
+_STOP_RP_MARKER_B = _STOP_RP_MARKER.encode()
+_STOP_RP_RE_B = re.compile(_STOP_RP_RE.pattern.encode(), re.ASCII)
+# grep -E twin of _STOP_RP_RE for the remote scan: a line matches one
+# exactly when the other finds a name in it ([[:space:]] is \s, and a line
+# holds no \n)
+_STOP_RP_ERE = _STOP_RP_MARKER + '[[:space:]]+""?[^",\r]'
+
+
+def parse_latest_recovery_stop_restore_point(log_text: Union[str, bytes]) -> Optional[str]:
     """
     Parse the most recent restore point name from lines like:
       recovery stopping at restore point "sync_point_20260201_183847", time ...
 
+    Accepts str, or raw bytes (only the matched name is decoded).
     Returns restore_point string or None.
     """
     if not log_text:
         return None
+    if isinstance(log_text, bytes):
+        marker, rx = _STOP_RP_MARKER_B, _STOP_RP_RE_B
+    else:
+        marker, rx = _STOP_RP_MARKER, _STOP_RP_RE
 
-    # We want the *latest* occurrence in the tailed chunk.
-    rp: Optional[str] = None
-
-    for line in log_text.splitlines():
-        if "recovery stopping at restore point" not in line:
-            continue
-
-        # Works for CSV log lines too (quoted fields)
-        # Example snippet:
-        # ...,"LOG","00000","recovery stopping at restore point ""sync_point_..."" ...
-        m = re.search(r'recovery stopping at restore point\s+""?([^",]+)""?', line)
-        if m:
-            rp = m.group(1).strip()
-
-    return rp
+    # We want the *latest* occurrence in the tailed chunk. rfind the fixed
+    # marker first (no match is the common case and costs one C scan), then
+    # run the regex only at that spot.
+    i = log_text.rfind(marker)
+    if i < 0:
+        return None
+    m = rx.match(log_text, i)
+    if not m:
+        # last marker line is malformed; fall back to the earlier ones
+        found = rx.findall(log_text, 0, i)
+        if not found:
+            return None
+        rp = found[-1]
+    else:
+        rp = m.group(1)
+    if isinstance(rp, bytes):
+        rp = rp.decode("utf-8", "replace")
+    return rp.strip()
 
 def recent_log_csv(inst: DrInstance, k: int = 5) -> List[str]:
     """
@@ -313,11 +756,13 @@ def recent_log_csv(inst: DrInstance, k: int = 5) -> List[str]:
     Newest first. May be empty.
     """
     logdir = f"{inst.data_dir}/log"
+    if inst.is_local:
+        return _local_recent_csvs(logdir, k)
     script = (
         "set -euo pipefail; "
         f"ls -1t {sh_quote(logdir)}/*.csv 2>/dev/null | head -n {int(k)} || true"
     )
-    out = run(["bash", "-lc", script], check=False) if inst.is_local else ssh_bash(inst.host, script, check=False)
+    out = ssh_bash(inst.host, script, check=False)
     return [ln.strip() for ln in (out or "").splitlines() if ln.strip()]
 
 
@@ -329,69 +774,136 @@ def last_stopped_restore_point_scan(
     """
     Scan newest K CSV log files and return the most recent 'recovery stopping at restore point' seen.
     Returns (restore_point, logfile_path_where_found_or_newest_checked).
+
+    Runs as one remote script over the newest K files (newest first): for
+    each, only its last tail_n lines are read (tail seeks from the end) and
+    every marker line in them comes back, so the same parser as the local
+    scan picks the match (falling back to earlier lines of the file when the
+    latest is malformed). The loop ends at the first file with a line
+    _STOP_RP_ERE accepts; only the newest file name and the marker lines
+    come back over ssh.
     """
-    files = recent_log_csv(inst, k=k_files)
-    if not files:
-        return None, None
+    logdir = f"{inst.data_dir}/log"
+    if inst.is_local:
+        return _local_stopped_restore_point_scan(logdir, k_files, tail_n)
+    script = (
+        "set -euo pipefail; "
+        f"files=$(ls -1t {sh_quote(logdir)}/*.csv 2>/dev/null | head -n {int(k_files)} || true); "
+        '[ -n "$files" ] || exit 0; '
+        "set -f; IFS=$'\\n'; set -- $files; "
+        "printf 'F:%s\\n' \"$1\"; "
+        'for f in "$@"; do '
+        f'm=$(tail -n {int(tail_n)} -- "$f" | grep -F {sh_quote(_STOP_RP_MARKER)}) || true; '
+        '[ -n "$m" ] || continue; '
+        'while IFS= read -r l; do printf \'M:%s\\t%s\\n\' "$f" "$l"; done <<<"$m"; '
+        f'if grep -qE {sh_quote(_STOP_RP_ERE)} <<<"$m"; then break; fi; '
+        "done"
+    )
+    out = ssh_bash(inst.host, script, check=False)
+
+    newest: Optional[str] = None
+    marker_lines: Dict[str, List[str]] = {}
+    for ln in (out or "").splitlines():
+        if ln.startswith("F:") and newest is None:
+            newest = ln[2:].strip() or None
+        elif ln.startswith("M:"):
+            f, _, line = ln[2:].partition("\t")
+            marker_lines.setdefault(f, []).append(line)
+    for f, lines in marker_lines.items():
+        rp = parse_latest_recovery_stop_restore_point("\n".join(lines))
+        if rp:
+            return rp, f
+    return None, newest
+
+
+def _csv_mtimes(it: Iterator[os.DirEntry]) -> Iterator[Tuple[float, str]]:
+    # (mtime, path) of the CSVs in it, skipping any rotated away or deleted
+    # since the scandir listed it (`ls -1t ... 2>/dev/null` drops them too)
+    for e in it:
+        if e.name.endswith(".csv"):
+            try:
+                if e.is_file():
+                    yield e.stat().st_mtime, e.path
+            except OSError:
+                pass
+
 
+def _local_recent_csvs(logdir: str, k: int) -> List[str]:
+    # Newest k CSVs by mtime, newest first (local `ls -1t *.csv | head -n k`).
+    try:
+        with os.scandir(logdir) as it:
+            return [path for _, path in heapq.nlargest(int(k), _csv_mtimes(it))]
+    except OSError:
+        return []
+
+
+def _local_stopped_restore_point_scan(logdir: str, k_files: int, tail_n: int) -> Tuple[Optional[str], Optional[str]]:
+    # In-process version of the remote scan for local instances: newest K
+    # CSVs by mtime, mmap tail of each, first file with a signature wins.
+    files = _local_recent_csvs(logdir, k_files)
     for f in files:
-        txt = tail_text_file(inst, f, n=tail_n)
-        rp = parse_latest_recovery_stop_restore_point(txt)
+        rp = parse_latest_recovery_stop_restore_point(_mmap_tail(f, int(tail_n)))
         if rp:
             return rp, f
+    return None, (files[0] if files else None)
 
-    return None, files[0]
 
 def last_stopped_restore_point(inst: DrInstance, n: int = 300) -> Tuple[Optional[str], Optional[str]]:
     """
     Returns (restore_point, logfile_path).
     If not found, returns (None, logfile_path or None).
-    """
-    f = newest_log_csv(inst)
-    if not f or not f.endswith(".csv") or "bash --noprofile" in f:
-        print(f"[DR][seg={inst.gp_segment_id}] LOG invalid logfile path: {f!r}")
-        return None, None
-    #if not f:
-    #    return None, None
 
-    txt = tail_text_file(inst, f, n=n)
-    rp = parse_latest_recovery_stop_restore_point(txt)
-    return rp, f
+    The newest CSV only: last_stopped_restore_point_scan with k_files=1, so
+    a remote instance costs one ssh call and ships back the newest file name
+    and the signature line rather than the whole tail.
+    """
+    return last_stopped_restore_point_scan(inst, k_files=1, tail_n=n)
 
 
 # =============================
 # pg_ctl
 # =============================
-def _pg_ctl_stop(inst: DrInstance, gp_home: str) -> None:
-    check_stop()
-    if inst.gp_segment_id == -1:
-        cmd = (
-            f"source {gp_home}/greenplum_path.sh && "
-            f"export COORDINATOR_DATA_DIRECTORY={inst.data_dir} && "
-            f"pg_ctl -D {inst.data_dir} stop -m fast"
-        )
-        run(["bash", "-lc", cmd], check=False)
-        return
-    cmd = f"source {gp_home}/greenplum_path.sh && pg_ctl -D {inst.data_dir} stop -m fast"
-    gpssh_bash(inst.host, cmd, check=False)
+def _segment_bash(inst: DrInstance, script: str) -> str:
+    # Local segments need no ssh at all; remote ones reuse the host's
+    # ControlMaster (greenplum_path.sh is sourced explicitly, so no login
+    # shell or gpssh environment is needed).
+    if inst.is_local:
+        return run(["bash", "-c", script], check=False)
+    return ssh_bash(inst.host, script, check=False)
+
 
+# pg_ctl stop waits (-w) for the shutdown to finish, up to this many
+# seconds, so the start that follows needs no blind sleep.
+_PG_CTL_STOP_WAIT_SECS = 30
 
-def _pg_ctl_start(inst: DrInstance, gp_home: str) -> None:
+
+def _pg_ctl_restart(inst: DrInstance, gp_home: str) -> str:
+    """
+    Stop, preflight and start one instance in a single script (one ssh call
+    for a remote segment) and return the preflight line. The coordinator
+    runs locally with COORDINATOR_DATA_DIRECTORY set and skips the preflight.
+    """
     check_stop()
-    logfile = f"{inst.data_dir}/start.log"
+    gpp = f"{sh_quote(gp_home)}/greenplum_path.sh"
+    dd = sh_quote(inst.data_dir)
+    logfile = sh_quote(f"{inst.data_dir}/start.log")
+    stop = f"pg_ctl -D {dd} stop -m fast -w -t {_PG_CTL_STOP_WAIT_SECS}"
     if inst.gp_segment_id == -1:
-        cmd = (
-            f"source {gp_home}/greenplum_path.sh && "
-            f"export COORDINATOR_DATA_DIRECTORY={inst.data_dir} && "
-            f"pg_ctl -D {inst.data_dir} -o \"-c gp_role=utility\" -l {sh_quote(logfile)} start"
+        env = f"source {gpp} && export COORDINATOR_DATA_DIRECTORY={dd}"
+        script = (
+            f"( {env} && {stop} ) >/dev/null 2>&1\n"
+            f"( {env} && pg_ctl -D {dd} -o \"-c gp_role=utility\" -l {logfile} start ) >/dev/null 2>&1; true"
         )
-        run(["bash", "-lc", cmd], check=False)
-        return
-    cmd = (
-        f"source {gp_home}/greenplum_path.sh && "
-        f"pg_ctl -D {inst.data_dir} -o \"-c gp_role=utility -c port={inst.port}\" start -l {sh_quote(logfile)}"
+        run(["bash", "-lc", script], check=False)
+        return ""
+    script = (
+        f"( source {gpp} && {stop} ) >/dev/null 2>&1\n"
+        f"if test -f {gpp} && test -d {dd}; then echo OK host=$(hostname) datadir={dd}; "
+        f"else echo FAILED greenplum_path.sh or datadir missing; fi\n"
+        f"( source {gpp} && pg_ctl -D {dd} -o \"-c gp_role=utility -c port={inst.port}\" start -l {logfile} ) "
+        f">/dev/null 2>&1; true"
     )
-    gpssh_bash(inst.host, cmd, check=False)
+    return _segment_bash(inst, script).strip()
 
 
 # =============================
@@ -410,10 +922,11 @@ def _list_manifest_files(cfg: Config) -> List[str]:
     - SSH: "ssh remote-host ls {manifest_dir}/"
     
     Returns:
-        List of manifest filenames (not full paths)
+        List of manifest filenames (not full paths), sorted ascending.
+        sync_point_YYYYMMDD_HHMMSS names sort chronologically, so callers
+        can parse in order and stop at the first match instead of parsing
+        every manifest.
     """
-    from pathlib import Path
-    
     if cfg.manifest_list_command:
         # Use custom list command
         script = cfg.manifest_list_command.format(
@@ -424,8 +937,7 @@ def _list_manifest_files(cfg: Config) -> List[str]:
             result = run(["bash", "-c", script], check=False)
             if result and result.strip():
                 # Parse output - expect one filename per line
-                files = [line.strip() for line in result.strip().splitlines() if line.strip()]
-                return files
+                return sorted(ln for ln in map(str.strip, result.splitlines()) if ln)
             else:
                 print(f"[DR] Remote manifest list failed or returned empty")
                 return []
@@ -434,11 +946,11 @@ def _list_manifest_files(cfg: Config) -> List[str]:
             return []
     else:
         # Default: local file access
-        manifest_dir = Path(cfg.manifest_dir)
-        if not manifest_dir.exists():
-            return []
         try:
-            return [p.name for p in manifest_dir.glob("*.json")]
+            with os.scandir(cfg.manifest_dir) as it:
+                return sorted(e.name for e in it if e.name.endswith(".json") and e.is_file())
+        except FileNotFoundError:
+            return []
         except Exception as e:
             print(f"[DR] Error listing local manifests: {e}")
             return []
@@ -503,6 +1015,99 @@ def _fetch_manifest_content(cfg: Config, manifest_path: str) -> Optional[str]:
             return None
 
 
+# Parsed local manifests keyed by path, valid while (inode, mtime_ns, size)
+# is unchanged. The publisher replaces manifests atomically, so any rewrite
+# changes the key. Entries for paths that no longer exist are evicted after
+# each daemon cycle (_evict_gone_manifests).
+_MANIFEST_CACHE: Dict[str, Tuple[Tuple[int, int, int], dict]] = {}
+_MANIFEST_CACHE_MAX = 64
+
+
+def _manifest_cache_put(cache: Dict[K, T], key: K, value: T) -> None:
+    # Least recently used first (dicts keep insertion order, and a hit is
+    # re-put): a full cache drops only its oldest entry, so a sweep over many
+    # manifests doesn't evict the hot LATEST one with the rest.
+    cache.pop(key, None)
+    if len(cache) >= _MANIFEST_CACHE_MAX:
+        cache.pop(next(iter(cache)))
+    cache[key] = value
+
+
+def _evict_gone_manifests() -> None:
+    for path in [p for p in _MANIFEST_CACHE if not os.path.exists(p)]:
+        del _MANIFEST_CACHE[path]
+
+# Parsed remote manifests keyed by (fetch command, path) -> (stat token, m).
+# A ready sync-point manifest is never rewritten by the publisher, so it is
+# reused without asking the remote at all; anything else (LATEST, pending
+# manifests) is reused only while manifest_stat_command prints the same
+# token.
+_REMOTE_MANIFEST_CACHE: Dict[Tuple[str, str], Tuple[str, dict]] = {}
+
+
+def _remote_manifest_stat(cfg: Config, manifest_path: str) -> str:
+    script = cfg.manifest_stat_command.format(
+        manifest_path=manifest_path,
+        manifest_dir=cfg.manifest_dir,
+        manifest_file=Path(manifest_path).name,
+    )
+    try:
+        return run(["bash", "-c", script], check=False).strip()
+    except Exception:
+        return ""
+
+
+def _read_remote_manifest(cfg: Config, manifest_path: str) -> Optional[dict]:
+    ckey = (cfg.manifest_fetch_command, manifest_path)
+    hit = _REMOTE_MANIFEST_CACHE.get(ckey)
+    if hit and manifest_path != cfg.latest_path and _manifest_ready(hit[1]):
+        _manifest_cache_put(_REMOTE_MANIFEST_CACHE, ckey, hit)
+        return hit[1]
+
+    token = _remote_manifest_stat(cfg, manifest_path) if cfg.manifest_stat_command else ""
+    if hit and token and hit[0] == token:
+        _manifest_cache_put(_REMOTE_MANIFEST_CACHE, ckey, hit)
+        return hit[1]
+
+    content = _fetch_manifest_content(cfg, manifest_path)
+    if not content:
+        return None
+    m = json_loads(content)
+    _manifest_cache_put(_REMOTE_MANIFEST_CACHE, ckey, (token, m))
+    return m
+
+
+def _read_manifest(cfg: Config, manifest_path: str) -> Optional[dict]:
+    """
+    Fetch and decode a manifest. None if it doesn't exist / can't be
+    fetched; json.JSONDecodeError propagates. Callers must not mutate the
+    returned dict (it may be shared via the cache).
+    """
+    if cfg.manifest_fetch_command:
+        return _read_remote_manifest(cfg, manifest_path)
+
+    try:
+        st = os.stat(manifest_path)
+    except OSError:
+        return None
+    key = (st.st_ino, st.st_mtime_ns, st.st_size)
+    hit = _MANIFEST_CACHE.get(manifest_path)
+    if hit and hit[0] == key:
+        _manifest_cache_put(_MANIFEST_CACHE, manifest_path, hit)
+        return hit[1]
+    try:
+        # bytes (or, for a large manifest, the mmap'd file) straight into the
+        # decoder; orjson skips the str round-trip
+        m = json_load_file(manifest_path, st.st_size)
+    except OSError as e:
+        print(f"[DR] Error reading local manifest {manifest_path}: {e}")
+        return None
+    if m is None:
+        return None
+    _manifest_cache_put(_MANIFEST_CACHE, manifest_path, (key, m))
+    return m
+
+
 def _manifest_ready(m: dict) -> bool:
     return bool(m.get("ready", False)) and bool(m.get("restore_point")) and bool(m.get("segments"))
 
@@ -521,33 +1126,29 @@ def _load_target_manifest(cfg: Config, target: str) -> Optional[dict]:
         # Specific target requested
         manifest_path = f"{manifest_dir}/{target}.json" if not manifest_dir.endswith('/') else f"{manifest_dir}{target}.json"
         
-        content = _fetch_manifest_content(cfg, manifest_path)
-        if not content:
-            print(f"[DR] ERROR: manifest not found: {manifest_path}")
-            return None
-        
         try:
-            m = json.loads(content)
-            return m if _manifest_ready(m) else None
+            m = _read_manifest(cfg, manifest_path)
         except json.JSONDecodeError as e:
             print(f"[DR] ERROR: invalid JSON in manifest {manifest_path}: {e}")
             return None
+        if m is None:
+            print(f"[DR] ERROR: manifest not found: {manifest_path}")
+            return None
+        return m if _manifest_ready(m) else None
 
     # target == "LATEST": always use LATEST.json, do not fall back
-    content = _fetch_manifest_content(cfg, latest_path)
-    if not content:
-        print("[DR] No LATEST manifest exists.")
-        return None
-
     try:
-        m = json.loads(content)
-        if not _manifest_ready(m):
-            print("[DR] LATEST manifest not ready/valid yet. Will not use older manifests.")
-            return None
-        return m
+        m = _read_manifest(cfg, latest_path)
     except json.JSONDecodeError as e:
         print(f"[DR] ERROR: invalid JSON in LATEST manifest: {e}")
         return None
+    if m is None:
+        print("[DR] No LATEST manifest exists.")
+        return None
+    if not _manifest_ready(m):
+        print("[DR] LATEST manifest not ready/valid yet. Will not use older manifests.")
+        return None
+    return m
 
 
 # =============================
@@ -559,68 +1160,110 @@ def _get_current_restore_point(cfg: Config) -> str:
 
 
 def _set_current_restore_point(cfg: Config, rp: str) -> None:
-    state_file = Path(cfg.state_dir) / "current_restore_point.txt"
-    state_file.parent.mkdir(parents=True, exist_ok=True)
-    state_file.write_text(rp + "\n")
+    # atomic: a crash mid-write must not leave the daemon a torn state file
+    atomic_write_bytes(Path(cfg.state_dir) / "current_restore_point.txt", (rp + "\n").encode())
+
+
+# Receipts are an audit trail nothing in the cycle waits on: they're written
+# (tmp + fsync + rename) in order on one background thread so the fsyncs stay
+# off the cycle's return path. run_once/run_daemon flush before exiting.
+# State that drives the next cycle (current_restore_point.txt) stays
+# synchronous.
+_RECEIPT_WRITER: Optional[ThreadPoolExecutor] = None
+
+
+def _write_receipt_now(path: Path, obj: dict) -> None:
+    try:
+        atomic_write_json(path, obj)
+    except Exception as e:
+        _log(f"[DR] WARNING: failed to write receipt {path}: {e}")
+
+
+def _write_receipt(path: Path, obj: dict) -> None:
+    global _RECEIPT_WRITER
+    if _RECEIPT_WRITER is None:
+        _RECEIPT_WRITER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="receipts")
+    _RECEIPT_WRITER.submit(_write_receipt_now, path, obj)
+
+
+def _flush_receipts() -> None:
+    global _RECEIPT_WRITER
+    if _RECEIPT_WRITER is not None:
+        _RECEIPT_WRITER.shutdown(wait=True)
+        _RECEIPT_WRITER = None
 
 
 # =============================
 # WAL file helpers
 # =============================
-def _get_wal_segment_info(inst: DrInstance, gp_home: str) -> Tuple[int, int]:
+# _get_wal_segment_info results keyed by (host, data_dir) -> (size,
+# timeline), for the current cycle only: _cycle clears it, since the timeline
+# moves on promotion/end of recovery and a stale one yields old-timeline WAL
+# names that may well exist in the archive. A failed WAL pre-flight drops the
+# entry too.
+_WAL_INFO_CACHE: Dict[Tuple[str, str], Tuple[int, int]] = {}
+
+
+def _get_wal_segment_info(
+    inst: DrInstance, gp_home: str, ctl_info: Optional[Tuple[Optional[int], Optional[int]]] = None
+) -> Tuple[int, int]:
     """
     Get WAL segment size and current timeline ID from pg_controldata and timeline history files.
-    Returns (wal_segment_size_bytes, timeline_id).
+    Returns (wal_segment_size_bytes, timeline_id). Cached per instance for
+    the rest of the cycle. ctl_info, if given, is the (size, timeline) pair
+    from a controldata_full() the caller already ran, so pg_controldata
+    isn't run again; being fresher, it always wins over a cached entry.
     """
-    pgcd = f"{gp_home}/bin/pg_controldata"
-    cmd = f"{pgcd} {sh_quote(inst.data_dir)}"
-    out = run(["bash", "-lc", cmd], check=False) if inst.is_local else gpssh_bash(inst.host, cmd, check=False)
-    
-    wal_seg_size = 64 * 1024 * 1024  # default 64MB
-    timeline_id = 1  # default
-    
-    if out:
-        # Look for "Bytes per WAL segment:"
-        m = re.search(r"Bytes per WAL segment:\s+(\d+)", out)
-        if m:
-            wal_seg_size = int(m.group(1))
-        
-        # Look for timeline from pg_controldata
-        m = re.search(r"Latest checkpoint's TimeLineID:\s+(\d+)", out)
-        if m:
-            timeline_id = int(m.group(1))
+    key = (inst.host, inst.data_dir)
+    hit = _WAL_INFO_CACHE.get(key)
+    if hit and ctl_info is None:
+        return hit
+    info = _WAL_INFO_CACHE[key] = _read_wal_segment_info(inst, gp_home, ctl_info)
+    return info
+
+
+def _read_wal_segment_info(
+    inst: DrInstance, gp_home: str, ctl_info: Optional[Tuple[Optional[int], Optional[int]]] = None
+) -> Tuple[int, int]:
+    if ctl_info is None:
+        ctl_info = controldata_full(inst, gp_home)[1] or (None, None)
+    # defaults: 64MB segments, timeline 1
+    wal_seg_size = ctl_info[0] or 64 * 1024 * 1024
+    timeline_id = ctl_info[1] or 1
     
     # Check for timeline history files to get the most accurate current timeline
     # Timeline history files are named like 00000002.history, 00000003.history, etc.
     # The highest numbered .history file + 1 is the current timeline (or the value itself if on that timeline)
-    wal_dir = f"{inst.data_dir}/pg_wal"
-    # Try pg_wal first (PG 10+), fall back to pg_xlog (PG 9.6 and earlier)
-    history_cmd = (
-        f"ls {sh_quote(wal_dir)}/*.history 2>/dev/null || "
-        f"ls {sh_quote(inst.data_dir)}/pg_xlog/*.history 2>/dev/null || true"
-    )
-    
-    history_out = run(["bash", "-lc", history_cmd], check=False) if inst.is_local else ssh_bash(inst.host, history_cmd, check=False)
+    # pg_wal (PG 10+) and pg_xlog (PG 9.6 and earlier) listed in one pass
+    if inst.is_local:
+        history_out = _local_history_listing(inst.data_dir)
+    else:
+        dd = sh_quote(inst.data_dir)
+        history_cmd = f"find {dd}/pg_wal {dd}/pg_xlog -maxdepth 1 -name '*.history' -print 2>/dev/null"
+        history_out = ssh_bash(inst.host, history_cmd, check=False)
     
-    if history_out and history_out.strip():
-        # Parse timeline from history filenames
-        max_timeline = timeline_id  # Start with pg_controldata value
-        for line in history_out.strip().splitlines():
-            # Extract timeline number from filename like /path/00000003.history
-            m = re.search(r"/([0-9A-Fa-f]{8})\.history", line)
-            if m:
-                tl = int(m.group(1), 16)
-                if tl > max_timeline:
-                    max_timeline = tl
-        
-        # If we found history files, the current timeline is likely the max + 1
-        # or we're on the timeline of the latest history file
-        if max_timeline > timeline_id:
-            timeline_id = max_timeline
+    # Timeline numbers from filenames like /path/00000003.history, in one
+    # finditer pass over the listing; we're on the latest one if it's past
+    # pg_controldata's value.
+    for m in _HISTORY_FILE_RE.finditer(history_out or ""):
+        timeline_id = max(timeline_id, int(m.group(1), 16))
     
     return wal_seg_size, timeline_id
 
 
+def _local_history_listing(data_dir: str) -> str:
+    # Local equivalent of the `find pg_wal pg_xlog -name '*.history'` used
+    # for remote instances.
+    names: List[str] = []
+    for sub in ("pg_wal", "pg_xlog"):
+        try:
+            with os.scandir(f"{data_dir}/{sub}") as it:
+                names.extend(e.path for e in it if e.name.endswith(".history"))
+        except OSError:
+            continue
+    return "\n".join(names)
+
+
 def _wal_filename_for_lsn(lsn: str, timeline_id: int, wal_seg_size: int) -> str:
     """
     Convert LSN to WAL filename given timeline and segment size.
@@ -674,29 +1317,43 @@ def _list_wal_files_between_lsns(start_lsn: str, end_lsn: str, timeline_id: int,
     For 64MB segments: segments_per_xlogid = 64 (0x40), so seg ranges 0x00-0x3F
     For 16MB segments: segments_per_xlogid = 256 (0x100), so seg ranges 0x00-0xFF
     """
+    return list(_iter_wal_files_between_lsns(start_lsn, end_lsn, timeline_id, wal_seg_size))
+
+
+@lru_cache(maxsize=8)
+def _wal_seg_suffixes(segments_per_xlogid: int) -> Tuple[str, ...]:
+    # The 8-hex-digit segment part of every WAL name within one xlogid
+    # (64 for 64MB segments, 256 for 16MB): formatted once per segment size.
+    return tuple(f"{i:08X}" for i in range(segments_per_xlogid))
+
+
+def _iter_wal_files_between_lsns(start_lsn: str, end_lsn: str, timeline_id: int, wal_seg_size: int) -> Iterator[str]:
+    """
+    Generator form of _list_wal_files_between_lsns, for callers that stream
+    the names (or only need a prefix) without materialising the full list.
+    """
     start_int = lsn_to_int(start_lsn)
     end_int = lsn_to_int(end_lsn)
-    
     if start_int >= end_int:
-        return []
-    
-    # Calculate overall segment numbers
-    start_segno = start_int // wal_seg_size
-    end_segno = end_int // wal_seg_size
-    
-    # Calculate segments per log file (4GB address space)
+        return
+
+    # Segment numbers are global (xlogid * segments_per_xlogid + seg), so the
+    # range is (start_segno, end_segno]. It is walked one xlogid at a time:
+    # the timeline + xlogid prefix is formatted once per xlogid and each name
+    # is that prefix plus a preformatted segment suffix, i.e. one string
+    # concatenation per name.
     segments_per_xlogid = 0x100000000 // wal_seg_size
-    
-    files = []
-    
-    # Iterate through all segments from start+1 to end (inclusive)
-    for segno in range(start_segno + 1, end_segno + 1):
-        xlogid = segno // segments_per_xlogid
-        seg = segno % segments_per_xlogid
-        filename = f"{timeline_id:08X}{xlogid:08X}{seg:08X}"
-        files.append(filename)
-    
-    return files
+    suffixes = _wal_seg_suffixes(segments_per_xlogid)
+    tli = f"{timeline_id:08X}"
+    xlogid, seg = divmod(start_int // wal_seg_size + 1, segments_per_xlogid)
+    last_xlogid, last_seg = divmod(end_int // wal_seg_size, segments_per_xlogid)
+    while xlogid <= last_xlogid:
+        stop = last_seg + 1 if xlogid == last_xlogid else segments_per_xlogid
+        prefix = f"{tli}{xlogid:08X}"
+        for suffix in suffixes[seg:stop]:
+            yield prefix + suffix
+        xlogid += 1
+        seg = 0
 
 
 def _get_wal_check_command(cfg: Config, segment_id: int) -> str:
@@ -723,39 +1380,130 @@ def _get_wal_check_command(cfg: Config, segment_id: int) -> str:
     return cfg.wal_check_command
 
 
-def _check_wal_file_exists(archive_dir: str, wal_filename: str, host: str, is_local: bool, custom_cmd: str = "") -> bool:
+def _list_archive(script: str) -> Optional[Set[str]]:
+    """
+    Run a rendered wal_list_command and return the WAL names it printed
+    (basename of each line). None if the listing failed or printed nothing,
+    so callers fall back to per-file checks.
     """
-    Check if a WAL file exists in the archive directory (local or remote).
+    try:
+        out = run(["bash", "-c", script], check=False)
+    except ShutdownRequested:
+        raise
+    except Exception as e:
+        _log(f"[DR] WARNING: wal_list_command failed: {e}")
+        return None
+    names = {ln.strip().rsplit("/", 1)[-1] for ln in out.splitlines() if ln.strip()}
+    return names or None
+
+
+# Most WAL names one process/round-trip checks. The pre-flight has no cap on
+# the names it checks (only wal_enumerate_hard_limit), and a group's union
+# across segments can run to hundreds of thousands; batches keep every
+# script, and its reply, bounded.
+_WAL_CHECK_BATCH = 2000
+
+
+def _check_wal_files_exist(
+    archive_dir: str, wal_filenames: List[str], host: str, is_local: bool, custom_cmd: str = ""
+) -> Set[str]:
+    """
+    Return the subset of wal_filenames present in the archive directory
+    (local or remote), using one process/round-trip per _WAL_CHECK_BATCH
+    names.
     
     Supports custom check commands for flexibility (e.g., S3, API, remote SSH).
     Custom command template variables:
     - {archive_dir}: Archive directory path
     - {wal_filename}: WAL filename to check
+    - {wal_path}: {archive_dir}/{wal_filename}
     - {host}: Host where check should run
     
-    Custom command should output 'EXISTS' if file is present.
+    Custom command should output 'EXISTS' if file is present. The per-file
+    commands are run back to back from a single local bash, fed the script
+    on stdin.
     
     Examples:
     - SSH: "ssh {host} test -f {archive_dir}/{wal_filename} && echo EXISTS"
     - S3: "aws s3 ls s3://bucket/{archive_dir}/{wal_filename} && echo EXISTS"
     """
-    wal_path = f"{archive_dir}/{wal_filename}"
-    
+    if not wal_filenames:
+        return set()
+
+    if (custom_cmd or not is_local) and len(wal_filenames) > _WAL_CHECK_BATCH:
+        found: Set[str] = set()
+        for i in range(0, len(wal_filenames), _WAL_CHECK_BATCH):
+            found |= _check_wal_files_exist(
+                archive_dir, wal_filenames[i:i + _WAL_CHECK_BATCH], host, is_local, custom_cmd
+            )
+        return found
+
     if custom_cmd:
-        # Use custom command with template substitution
-        script = custom_cmd.format(
-            archive_dir=archive_dir,
-            wal_filename=wal_filename,
-            wal_path=wal_path,
-            host=host,
-        )
-        out = run(["bash", "-lc", script], check=False)
+        lines = []
+        for wal_filename in wal_filenames:
+            script = custom_cmd.format(
+                archive_dir=archive_dir,
+                wal_filename=wal_filename,
+                wal_path=f"{archive_dir}/{wal_filename}",
+                host=host,
+            )
+            lines.append(f"if ( {script} ) 2>/dev/null | grep -q EXISTS; then echo {sh_quote('OK:' + wal_filename)}; fi")
+        # On stdin rather than as a -c argument, which the kernel caps at
+        # 128 KiB (a few hundred lines). As in ssh_bash, the { } group is
+        # parsed whole and its commands (e.g. an ssh in custom_cmd) get
+        # /dev/null instead of the rest of the script as stdin.
+        out = run(["bash", "-s"], check=False, input="{\n" + "\n".join(lines) + "\n} </dev/null\n")
+    elif is_local:
+        return {f for f in wal_filenames if os.path.isfile(os.path.join(archive_dir, f))}
     else:
-        # Default: simple file existence check
-        script = f"test -f {sh_quote(wal_path)} && echo 'EXISTS' || echo 'MISSING'"
-        out = run(["bash", "-lc", script], check=False) if is_local else ssh_bash(host, script, check=False)
-    
-    return "EXISTS" in (out or "")
+        # WAL names are plain hex, safe to inline unquoted. Nearly all of
+        # them are normally present, so only the missing ones are printed;
+        # the trailing DONE tells a complete answer from a failed ssh or a
+        # missing directory (both of which count as nothing present).
+        script = (
+            f"cd -- {sh_quote(archive_dir)} || exit 0\n"
+            f"for f in {' '.join(wal_filenames)}; do [ -f \"$f\" ] || echo \"M:$f\"; done; echo DONE"
+        )
+        out = ssh_bash(host, script, check=False)
+        lines = (out or "").splitlines()
+        if not lines or lines[-1] != "DONE":
+            return set()
+        return set(wal_filenames).difference(ln[2:] for ln in lines if ln.startswith("M:"))
+
+    return {ln[3:] for ln in (out or "").splitlines() if ln.startswith("OK:")}
+
+
+# Replay position plus the WAL segment size and checkpoint timeline that
+# pg_controldata would report, from an instance that is up.
+_PREFLIGHT_SQL = (
+    "SELECT COALESCE(pg_last_wal_replay_lsn()::text, '') || '|' || "
+    "pg_size_bytes(current_setting('wal_segment_size'))::text || '|' || "
+    "(pg_control_checkpoint()).timeline_id::text;"
+)
+
+
+def _preflight_position(
+    inst: DrInstance, cfg: Config
+) -> Tuple[str, Optional[Tuple[Optional[int], Optional[int]]]]:
+    """
+    (current_lsn, (wal_seg_size_bytes, timeline_id)) for the WAL pre-flight.
+    An instance that is up and replaying answers over SQL, skipping the
+    fork + ssh + pg_controldata; otherwise pg_controldata is read.
+    """
+    if pg_ping(inst.host, inst.port, cfg.primary_user, cfg.primary_db) == PING_OK:
+        try:
+            ok, row, _ = try_sql(inst.host, inst.port, cfg.primary_user, cfg.primary_db, _PREFLIGHT_SQL)
+        except ShutdownRequested:
+            raise
+        except RuntimeError:
+            ok, row = False, None
+        if ok and row:
+            lsn, _, rest = row.partition("|")
+            size_s, _, tli_s = rest.partition("|")
+            if lsn and size_s.isdigit() and tli_s.isdigit():
+                return lsn, (int(size_s), int(tli_s))
+    lsns, info = controldata_full(inst, cfg.gp_home)
+    return lsns.get("min_recovery_end_lsn") or lsns.get("latest_checkpoint_lsn") or "0/0", info
 
 
 def _preflight_wal_check(
@@ -764,10 +1512,12 @@ def _preflight_wal_check(
     current_rp: str,
     target_rp: str,
     target_lsns: Dict[int, str],
+    pool: Optional[ThreadPoolExecutor] = None,
 ) -> Tuple[bool, Dict[int, List[str]]]:
     """
     Pre-flight check: verify all required WAL files exist before starting recovery.
-    Parallelized across all instances.
+    Parallelized across all instances (on pool, if given); segments sharing a
+    host and archive directory share one archive check.
     
     Returns (all_present, missing_by_segment) where:
     - all_present: True if all WAL files are present
@@ -775,76 +1525,107 @@ def _preflight_wal_check(
     """
     print("[DR] Pre-flight: checking WAL availability...")
     
-    # Get current state LSNs from pg_controldata (still sequential for simplicity)
-    current_lsns: Dict[int, str] = {}
-    for seg_id, inst in instances.items():
-        lsns = controldata_lsns(inst, cfg.gp_home)
-        # Use the highest LSN as current position
-        current_lsn = lsns.get("min_recovery_end_lsn") or lsns.get("latest_checkpoint_lsn") or "0/0"
-        current_lsns[seg_id] = current_lsn
-    
-    missing_by_segment: Dict[int, List[str]] = {}
-    all_present = True
-    
-    # Parallelize WAL checks across instances
-    with ThreadPoolExecutor(max_workers=min(len(instances), 32)) as executor:
-        futures = {}
-        for seg_id, inst in instances.items():
-            start_lsn = current_lsns.get(seg_id, "0/0")
-            end_lsn = target_lsns.get(seg_id, "0/0")
-            
-            future = executor.submit(
-                wal_precheck_instance,
-                inst,
-                cfg.gp_home,
-                cfg,
-                start_lsn,
-                end_lsn,
+    # Current LSNs and WAL segment info, in parallel: over SQL for instances
+    # that are up, else from one pg_controldata per instance
+    ctl = _map_instances(instances, lambda inst: _preflight_position(inst, cfg), pool)
+    current_lsns = {sid: lsn for sid, (lsn, _) in ctl.items()}
+
+    # WAL names each instance needs, in parallel.
+    def required_for(inst: DrInstance) -> List[str]:
+        sid = inst.gp_segment_id
+        try:
+            return _required_wal_names(
+                inst, cfg.gp_home, cfg, current_lsns.get(sid, "0/0"), target_lsns.get(sid, "0/0"), ctl[sid][1]
             )
-            futures[future] = seg_id
-        
-        # Collect results - fail fast on exceptions
-        for future in as_completed(futures):
-            try:
-                seg_id, missing = future.result()
-                if missing:
-                    missing_by_segment[seg_id] = missing
-                    all_present = False
-            except Exception as e:
-                seg_id = futures[future]
-                label = "[coord]" if seg_id == -1 else f"[seg={seg_id}]"
-                print(f"[DR]{label} WAL check failed: {e}")
-                raise
-    
-    return all_present, missing_by_segment
+        except Exception as e:
+            _log(f"[DR]{_get_instance_label(inst)} WAL check failed: {e}")
+            raise
+
+    required = _map_instances(instances, required_for, pool)
+    needed = {sid: inst for sid, inst in instances.items() if required[sid]}
+
+    # Bulk listings: one wal_list_command run per distinct rendered command
+    # (segments sharing an archive share it). Instances with their own
+    # wal_check_commands entry keep using it.
+    present: Dict[int, Optional[Set[str]]] = {}
+    if cfg.wal_list_command:
+        cmd_of = {
+            sid: cfg.wal_list_command.format(archive_dir=cfg.archive_dir, host=inst.host)
+            for sid, inst in needed.items()
+            if sid not in cfg.wal_check_commands
+        }
+        unique = sorted(set(cmd_of.values()))
+        if unique:
+            with _pool_or_new(pool, len(unique)) as executor:
+                results = dict(zip(unique, executor.map(_list_archive, unique)))
+            present = {sid: results[cmd] for sid, cmd in cmd_of.items()}
+
+    # Everything else: one existence check per (host, archive_dir, check
+    # command) for the union of its segments' names, instead of one per
+    # segment. Groups run in parallel.
+    groups: Dict[Tuple[str, bool, str], List[int]] = {}
+    for sid, inst in needed.items():
+        if present.get(sid) is None:
+            key = ("" if inst.is_local else inst.host, inst.is_local, _get_wal_check_command(cfg, sid))
+            groups.setdefault(key, []).append(sid)
+
+    def check_group(key: Tuple[str, bool, str]) -> Set[str]:
+        host, is_local, custom_cmd = key
+        names = sorted({w for sid in groups[key] for w in required[sid]})
+        return _check_wal_files_exist(cfg.archive_dir, names, host, is_local, custom_cmd)
+
+    if groups:
+        keys = list(groups)
+        with _pool_or_new(pool, len(keys)) as executor:
+            for key, found in zip(keys, executor.map(check_group, keys)):
+                for sid in groups[key]:
+                    present[sid] = found
+
+    missing_by_segment: Dict[int, List[str]] = {}
+    for sid, inst in needed.items():
+        missing = _missing_wals(inst, required[sid], present[sid] or set())
+        if missing:
+            missing_by_segment[sid] = missing
+
+    return not missing_by_segment, missing_by_segment
 
 
 def _validate_recovery_points(
     instances: Dict[int, DrInstance],
     target_rp: str,
+    known: Optional[Dict[int, Optional[str]]] = None,
+    pool: Optional[ThreadPoolExecutor] = None,
 ) -> Tuple[bool, Dict[int, Optional[str]]]:
     """
     Validate that all segments stopped at the expected restore point.
+    known holds restore points already read from the logs this tick (by
+    check_instance_progress); only segments without one are re-scanned,
+    in parallel (on pool, if given).
     
     Returns (all_match, recovery_points) where:
     - all_match: True if all segments stopped at target_rp
     - recovery_points: dict of segment_id -> actual recovery_point found (or None)
     """
+    known = known or {}
+    rescan = {sid: inst for sid, inst in instances.items() if known.get(sid) is None}
+    scanned = _map_instances(
+        rescan, lambda inst: last_stopped_restore_point_scan(inst, k_files=5, tail_n=1500)[0], pool
+    )
     recovery_points: Dict[int, Optional[str]] = {}
     all_match = True
     
-    for seg_id, inst in instances.items():
-        rp, logfile = last_stopped_restore_point_scan(inst, k_files=5, tail_n=1500)
+    for seg_id in instances:
+        rp = scanned.get(seg_id, known.get(seg_id))
         recovery_points[seg_id] = rp
         
         if rp != target_rp:
             all_match = False
             if rp:
-                print(f"[DR][seg={seg_id}] [FAIL] Recovery point mismatch: expected={target_rp}, actual={rp}")
+                _log(f"[DR][seg={seg_id}] [FAIL] Recovery point mismatch: expected={target_rp}, actual={rp}")
             else:
-                print(f"[DR][seg={seg_id}] [FAIL] No recovery point found in logs (expected={target_rp})")
+                _log(f"[DR][seg={seg_id}] [FAIL] No recovery point found in logs (expected={target_rp})")
         else:
-            print(f"[DR][seg={seg_id}] [OK] Recovery point matches: {rp}")
+            _log(f"[DR][seg={seg_id}] [OK] Recovery point matches: {rp}")
     
     return all_match, recovery_points
 
@@ -853,6 +1634,31 @@ def _validate_recovery_points(
 # =============================
 # Parallel execution helpers
 # =============================
+def _pool_or_new(pool: Optional[ThreadPoolExecutor], n_tasks: int) -> ContextManager[ThreadPoolExecutor]:
+    """
+    Context manager yielding pool (left running for the caller's next phase)
+    or, without one, a fresh executor sized for n_tasks.
+    """
+    if pool is not None:
+        return nullcontext(pool)
+    return ThreadPoolExecutor(max_workers=min(max(n_tasks, 1), 32))
+
+
+def _map_instances(
+    instances: Dict[int, DrInstance],
+    fn: Callable[[DrInstance], T],
+    pool: Optional[ThreadPoolExecutor] = None,
+) -> Dict[int, T]:
+    """
+    Run fn(inst) for every instance concurrently (each call is SSH/IO bound)
+    and return {seg_id: result}. The first exception propagates.
+    """
+    if not instances:
+        return {}
+    with _pool_or_new(pool, len(instances)) as ex:
+        return dict(zip(instances, ex.map(fn, instances.values())))
+
+
 def _get_instance_label(inst: DrInstance) -> str:
     """Return a label for logging: [coord] or [seg=N]"""
     return "[coord]" if inst.gp_segment_id == -1 else f"[seg={inst.gp_segment_id}]"
@@ -867,16 +1673,145 @@ def configure_instance_recovery(
     Configure recovery target settings for a single instance.
     Thread-safe: operates on distinct per-instance files.
     """
+    if not inst.is_local:
+        # standby.signal + conf edits in one ssh call
+        configure_host_recovery(inst.host, [inst], target_rp)
+        return
     check_stop()
     label = _get_instance_label(inst)
-    print(f"[DR]{label} Configuring recovery target={target_rp}")
+    _log(f"[DR]{label} Configuring recovery target={target_rp}")
     
     ensure_standby_signal(inst)
-    set_recovery_target_action_shutdown(inst)
-    clear_recovery_targets(inst)
-    set_recovery_target_name(inst, target_rp)
+    if not edit_conf(inst, _recovery_conf_edits(target_rp)):
+        _log(f"[DR]{label} Recovery target already set; conf unchanged")
     
-    print(f"[DR]{label} Configuration complete")
+    _log(f"[DR]{label} Configuration complete")
+
+
+def _recovery_conf_edits(target_rp: str) -> List[Tuple[str, str]]:
+    """
+    postgresql.conf edits for one recovery target, covering what
+    set_recovery_target_action_shutdown + clear_recovery_targets +
+    set_recovery_target_name did separately. recovery_target_name is set
+    rather than cleared-then-set so a repeat is a no-op.
+    """
+    edits = [("recovery_target_action", "recovery_target_action = 'shutdown'")]
+    return edits + _recovery_target_edits("recovery_target_name", target_rp)
+
+
+# Remote segments sharing a host are configured and restarted with one
+# script per host instead of several ssh/gpssh calls per segment. Local
+# instances keep the per-instance path, and so does starting the
+# coordinator (which needs COORDINATOR_DATA_DIRECTORY); its conf edits
+# can ride along with its host's segments.
+
+
+def _split_by_host(
+    instances: Dict[int, DrInstance], group_coordinator: bool = False
+) -> Tuple[List[DrInstance], Dict[str, List[DrInstance]]]:
+    """
+    Return (instances handled one by one, remote instances grouped by host).
+    A remote coordinator is grouped only if group_coordinator is set.
+    """
+    single: List[DrInstance] = []
+    by_host: Dict[str, List[DrInstance]] = {}
+    for inst in instances.values():
+        if inst.is_local or (inst.gp_segment_id == -1 and not group_coordinator):
+            single.append(inst)
+        else:
+            by_host.setdefault(inst.host, []).append(inst)
+    return single, by_host
+
+
+def configure_host_recovery(host: str, insts: List[DrInstance], target_rp: str) -> None:
+    """
+    configure_instance_recovery for every instance on one remote host in a
+    single ssh call: touch standby.signal and run rewrite_conf_kvs on each
+    postgresql.conf (written only where something changed).
+    """
+    check_stop()
+    for inst in insts:
+        _log(f"[DR]{_get_instance_label(inst)} Configuring recovery target={target_rp}")
+
+    edits = _recovery_conf_edits(target_rp)
+    parts = ["set -euo pipefail"]
+    for inst in insts:
+        parts.append(f"touch -- {sh_quote(inst.data_dir + '/standby.signal')}")
+        parts.append(rewrite_conf_kvs(inst.data_dir + "/postgresql.conf", edits, tag=f"{inst.gp_segment_id}:"))
+    out = ssh_bash(host, "\n".join(parts), check=True)
+
+    unchanged = {ln.partition(":")[0] for ln in out.splitlines() if ln.endswith(":UNCHANGED")}
+    for inst in insts:
+        label = _get_instance_label(inst)
+        if str(inst.gp_segment_id) in unchanged:
+            _log(f"[DR]{label} Recovery target already set; conf unchanged")
+        _log(f"[DR]{label} Configuration complete")
+
+
+def start_host_instances(host: str, insts: List[DrInstance], gp_home: str) -> None:
+    """
+    start_instance for every instance on one remote host in one ssh call:
+    stop all (in parallel, each waiting for its shutdown), preflight, start
+    all (in parallel).
+    """
+    check_stop()
+    for inst in insts:
+        _log(f"[DR]{_get_instance_label(inst)} Stopping instance, preflight, starting in utility mode")
+    gpp = f"{sh_quote(gp_home)}/greenplum_path.sh"
+    src = f"source {gpp}"
+    parts = []
+    for inst in insts:
+        parts.append(
+            f"( {src} && pg_ctl -D {sh_quote(inst.data_dir)} stop -m fast -w -t {_PG_CTL_STOP_WAIT_SECS} ) "
+            f">/dev/null 2>&1 &"
+        )
+    parts.append("wait")
+    for inst in insts:
+        dd = sh_quote(inst.data_dir)
+        parts.append(
+            f"if test -f {gpp} && test -d {dd}; then echo 'P:{inst.gp_segment_id}:OK host='$(hostname) datadir={dd}; "
+            f"else echo 'P:{inst.gp_segment_id}:FAILED greenplum_path.sh or datadir missing'; fi"
+        )
+    for inst in insts:
+        logfile = sh_quote(f"{inst.data_dir}/start.log")
+        parts.append(
+            f"( {src} && pg_ctl -D {sh_quote(inst.data_dir)} "
+            f"-o \"-c gp_role=utility -c port={inst.port}\" start -l {logfile} ) >/dev/null 2>&1 &"
+        )
+    parts.append("wait")
+    out = ssh_bash(host, "\n".join(parts), check=False)
+
+    labels = {inst.gp_segment_id: _get_instance_label(inst) for inst in insts}
+    for ln in (out or "").splitlines():
+        if ln.startswith("P:"):
+            seg_s, _, msg = ln[2:].partition(":")
+            _log(f"[DR]{labels.get(int(seg_s), f'[seg={seg_s}]')} preflight: {msg}")
+    for inst in insts:
+        _log(f"[DR]{_get_instance_label(inst)} Start initiated")
+
+
+def _run_tasks(
+    tasks: List[Tuple[str, Callable[..., None], tuple]], what: str, pool: Optional[ThreadPoolExecutor] = None
+) -> None:
+    """
+    Run (label, fn, args) tasks concurrently. Every failure is logged as
+    "<label> <what>: <error>"; once all tasks have finished, the first one
+    is re-raised. Waiting for the rest means a failure never leaves sibling
+    stops/starts still running on the shared pool behind the caller.
+    """
+    if not tasks:
+        return
+    errors: List[Exception] = []
+    with _pool_or_new(pool, len(tasks)) as executor:
+        futures = {executor.submit(fn, *args): label for label, fn, args in tasks}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                _log(f"[DR]{futures[future]} {what}: {e}")
+                errors.append(e)
+    if errors:
+        raise errors[0]
 
 
 def start_instance(
@@ -889,17 +1824,37 @@ def start_instance(
     """
     check_stop()
     label = _get_instance_label(inst)
-    print(f"[DR]{label} Stopping instance")
-    
-    _pg_ctl_stop(inst, gp_home)
-    time.sleep(1)
+    _log(f"[DR]{label} Stopping instance, preflight, starting in utility mode")
     
-    print(f"[DR]{label} Running preflight checks")
-    _preflight(inst, gp_home)
-    
-    print(f"[DR]{label} Starting instance in utility mode")
-    _pg_ctl_start(inst, gp_home)
-    print(f"[DR]{label} Start initiated")
+    pre = _pg_ctl_restart(inst, gp_home)
+    if pre:
+        _log(f"[DR]{label} preflight: {pre}")
+    _log(f"[DR]{label} Start initiated")
+
+
+class _LsnCache:
+    """
+    Tiny TTL cache for LSNs read from instances (e.g. pg_controldata's
+    min recovery ending location, which only moves forward). Keys are
+    per instance, so concurrent workers never touch the same entry.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self.m: Dict[Tuple[int, str], Tuple[float, Lsn]] = {}
+
+    def get(self, k: Tuple[int, str]) -> Optional[Lsn]:
+        v = self.m.get(k)
+        return v[1] if v and time.monotonic() < v[0] else None
+
+    def put(self, k: Tuple[int, str], v: Lsn) -> None:
+        self.m[k] = (time.monotonic() + self.ttl, v)
+
+    def invalidate(self, k: Tuple[int, str]) -> None:
+        self.m.pop(k, None)
+
+
+_PROGRESS_SQL = "SELECT pg_is_in_recovery()::text || '|' || COALESCE(pg_last_wal_replay_lsn()::text, '');"
 
 
 def check_instance_progress(
@@ -907,7 +1862,9 @@ def check_instance_progress(
     gp_home: str,
     user: str,
     db: str,
-    target_lsn: str,
+    target_lsn: Union[str, Lsn],
+    floor_cache: Optional[_LsnCache] = None,
+    sql_timeout: Optional[float] = None,
 ) -> Tuple[bool, Optional[str], Optional[str]]:
     """
     Check if an instance has reached the target LSN and stopped.
@@ -916,54 +1873,144 @@ def check_instance_progress(
     - reached_target: True if instance confirmed at target (down or replay >= target)
     - replay_lsn: pg_last_wal_replay_lsn if instance is UP, else None
     - recovery_point: restore point found in logs if instance is DOWN, else None
+
+    If floor_cache is given, a cached min_recovery_end_lsn that already
+    satisfies the target is reused instead of re-running pg_controldata.
+    target_lsn may be passed pre-parsed (Lsn) by callers polling in a loop.
+    sql_timeout bounds the SQL probe; an instance that doesn't answer in
+    time is treated like one that refuses connections.
     
     Thread-safe: only reads instance state, no shared mutation.
     """
     check_stop()
     label = _get_instance_label(inst)
-    
-    # Check if instance is UP via SQL
-    ok, replay, _ = try_sql(inst.host, inst.port, user, db, "SELECT pg_last_wal_replay_lsn();")
-    if ok and replay:
-        replay_s = replay.strip()
-        reached = lsn_ge(replay_s, target_lsn)
-        print(f"[DR]{label} UP replay_lsn={replay_s} target_lsn={target_lsn} reached={reached}")
+    cache_key = (inst.gp_segment_id, inst.data_dir)
+    target = Lsn.parse(target_lsn)
+    tgt = target.val
+    
+    # Check if instance is UP via SQL (skip psql entirely when nothing is
+    # listening on the port, or the postmaster is refusing sessions).
+    # Recovery state and replay LSN come back from one query.
+    ok, row = False, None
+    ping = pg_ping(inst.host, inst.port, user, db)
+    if ping == PING_REJECT:
+        # Postmaster up but not taking sessions (starting up, or shutting
+        # down, possibly at the target): not down yet, so keep waiting. The
+        # empty replay LSN marks it up without a usable position.
+        _log(f"[DR]{label} UP but not accepting connections yet; target_lsn={target.raw}")
+        return False, "", None
+    if ping == PING_OK:
+        ok, row, _ = try_sql(inst.host, inst.port, user, db, _PROGRESS_SQL, sql_timeout)
+    if ok and row:
+        in_rec, _, replay_s = row.strip().partition("|")
+        if in_rec != "true":
+            # Up but not replaying WAL (e.g. promoted): not at target, and
+            # not down either, so the cycle keeps waiting rather than validating.
+            _log(f"[DR]{label} UP but not in recovery (pg_is_in_recovery={in_rec}); cannot reach target_lsn={target.raw}")
+            return False, replay_s, None
+        reached = lsn_ge_int(replay_s, tgt)
+        _log(f"[DR]{label} UP replay_lsn={replay_s} target_lsn={target.raw} reached={reached}")
+        if floor_cache is not None:
+            floor_cache.invalidate(cache_key)
         return reached, replay_s, None
     
-    # Instance is DOWN - check via pg_controldata
-    floor = _pg_controldata_min_recovery_end_lsn(inst, gp_home)
-    if floor and lsn_ge(floor, target_lsn):
-        print(f"[DR]{label} DOWN controldata_ok min_recovery_end_lsn={floor} >= target_lsn={target_lsn}")
+    # Instance is DOWN - check via pg_controldata (unless a cached floor
+    # already satisfies the target; the floor never moves backwards)
+    floor = floor_cache.get(cache_key) if floor_cache is not None else None
+    lsns: Dict[str, str] = {}
+    if not (floor and floor.val >= tgt):
+        # One pg_controldata read serves both the floor check and the
+        # checkpoint/redo fallback below. The floor is parsed once and
+        # cached as an Lsn, so later ticks compare ints.
+        lsns = controldata_lsns_cached(inst, gp_home)
+        try:
+            floor = Lsn.parse(lsns["min_recovery_end_lsn"]) if lsns.get("min_recovery_end_lsn") else None
+        except ValueError:
+            floor = None
+        if floor and floor_cache is not None:
+            floor_cache.put(cache_key, floor)
+    if floor and floor.val >= tgt:
+        _log(f"[DR]{label} DOWN controldata_ok min_recovery_end_lsn={floor.raw} >= target_lsn={target.raw}")
         # Also get recovery point from logs
         rp, logfile = last_stopped_restore_point_scan(inst, k_files=5, tail_n=1500)
         if rp:
-            print(f"[DR]{label} LOG stop_restore_point={rp} file={logfile}")
+            _log(f"[DR]{label} LOG stop_restore_point={rp} file={logfile}")
         else:
-            print(f"[DR]{label} LOG no stop signature found (tail) file={logfile or '-'}")
+            _log(f"[DR]{label} LOG no stop signature found (tail) file={logfile or '-'}")
         return True, None, rp
     
-    # Check other LSNs from controldata
-    ok_cd, lsns = controldata_reached_target(inst, gp_home, target_lsn)
-    if ok_cd:
-        print(f"[DR]{label} DOWN controldata_ok {lsns}")
+    # Check other LSNs from the same controldata read
+    if any(lsn_ge_int(v, tgt) for v in lsns.values()):
+        _log(f"[DR]{label} DOWN controldata_ok {lsns}")
         rp, logfile = last_stopped_restore_point_scan(inst, k_files=5, tail_n=1500)
         if rp:
-            print(f"[DR]{label} LOG stop_restore_point={rp} file={logfile}")
+            _log(f"[DR]{label} LOG stop_restore_point={rp} file={logfile}")
         return True, None, rp
     
-    print(f"[DR]{label} DOWN not_confirmed {lsns or 'no_controldata'} < target_lsn={target_lsn}")
+    _log(f"[DR]{label} DOWN not_confirmed {lsns or 'no_controldata'} < target_lsn={target.raw}")
     return False, None, None
 
 
+def _required_wal_names(
+    inst: DrInstance,
+    gp_home: str,
+    cfg: Config,
+    current_lsn: str,
+    target_lsn: str,
+    ctl_info: Optional[Tuple[Optional[int], Optional[int]]] = None,
+) -> List[str]:
+    """
+    WAL file names inst needs to replay from current_lsn to target_lsn.
+    Refuses (rather than truncates) gaps past wal_enumerate_hard_limit and
+    never materialises more than limit + 1 names.
+    """
+    check_stop()
+    label = _get_instance_label(inst)
+
+    wal_seg_size, timeline_id = _get_wal_segment_info(inst, gp_home, ctl_info)
+
+    limit = cfg.wal_enumerate_hard_limit
+    required_wals = list(islice(_iter_wal_files_between_lsns(current_lsn, target_lsn, timeline_id, wal_seg_size), limit + 1))
+    if len(required_wals) > limit:
+        raise RuntimeError(
+            f"{label} WAL gap current={current_lsn} target={target_lsn} needs more than "
+            f"wal_enumerate_hard_limit={limit} segments; not checking a partial list"
+        )
+
+    if required_wals:
+        _log(f"[DR]{label} Checking {len(required_wals)} WAL files (current={current_lsn}, target={target_lsn})")
+    else:
+        _log(f"[DR]{label} No WAL files needed (current={current_lsn}, target={target_lsn})")
+    return required_wals
+
+
+def _missing_wals(inst: DrInstance, required_wals: List[str], present: Set[str]) -> List[str]:
+    """Return (and log) the required_wals not in present."""
+    label = _get_instance_label(inst)
+    missing = [w for w in required_wals if w not in present]
+    if missing:
+        _WAL_INFO_CACHE.pop((inst.host, inst.data_dir), None)
+        _log(f"[DR]{label} [FAIL] Missing {len(missing)} WAL file(s), first few: {missing[:5]}")
+    else:
+        _log(f"[DR]{label} [OK] All required WAL files present")
+    return missing
+
+
 def wal_precheck_instance(
     inst: DrInstance,
     gp_home: str,
     cfg: Config,
     current_lsn: str,
     target_lsn: str,
+    listing: Optional[Set[str]] = None,
+    ctl_info: Optional[Tuple[Optional[int], Optional[int]]] = None,
 ) -> Tuple[int, List[str]]:
     """
-    Check WAL availability for a single instance.
+    Check WAL availability for a single instance. listing, if given, is the
+    archive's file names from wal_list_command and is used instead of
+    checking each file; ctl_info is passed on to _get_wal_segment_info.
+    _preflight_wal_check does the same for many instances, sharing the
+    archive checks between segments.
     
     Returns (seg_id, missing_wals) where:
     - seg_id: instance gp_segment_id
@@ -971,43 +2018,44 @@ def wal_precheck_instance(
     
     Thread-safe: only reads archive state, no shared mutation.
     """
-    check_stop()
-    label = _get_instance_label(inst)
     seg_id = inst.gp_segment_id
-    
-    # Get WAL segment size and timeline
-    wal_seg_size, timeline_id = _get_wal_segment_info(inst, gp_home)
-    
-    # List required WAL files
-    required_wals = _list_wal_files_between_lsns(current_lsn, target_lsn, timeline_id, wal_seg_size)
-    
+    required_wals = _required_wal_names(inst, gp_home, cfg, current_lsn, target_lsn, ctl_info)
     if not required_wals:
-        print(f"[DR]{label} No WAL files needed (current={current_lsn}, target={target_lsn})")
         return seg_id, []
-    
-    print(f"[DR]{label} Checking {len(required_wals)} WAL files (current={current_lsn}, target={target_lsn})")
-    
-    # Check each WAL file
-    missing = []
-    archive_dir = cfg.archive_dir
-    custom_cmd = _get_wal_check_command(cfg, seg_id)
-    
-    for wal_file in required_wals[:100]:  # Limit to first 100
-        if not _check_wal_file_exists(archive_dir, wal_file, inst.host, inst.is_local, custom_cmd):
-            missing.append(wal_file)
-    
-    if missing:
-        print(f"[DR]{label} [FAIL] Missing {len(missing)} WAL file(s), first few: {missing[:5]}")
+
+    if listing is not None:
+        present = listing
     else:
-        print(f"[DR]{label} [OK] All required WAL files present")
-    
-    return seg_id, missing
+        present = _check_wal_files_exist(
+            cfg.archive_dir, required_wals, inst.host, inst.is_local, _get_wal_check_command(cfg, seg_id)
+        )
+    return seg_id, _missing_wals(inst, required_wals, present)
+
+def _next_poll_delay(delay: float, poll_secs: float, eta: Optional[float]) -> float:
+    """
+    Sleep before the next progress tick. eta is the estimated seconds until
+    the slowest replaying instance reaches its target (0 if one is already
+    there but still up), or None when progress can't be estimated (first
+    sample, stalled replay, or an instance down short of target).
+    """
+    ramp = min(poll_secs, max(0.2, delay * 2))
+    if eta is None:
+        return ramp
+    if eta <= poll_secs:
+        # About to finish: poll finely so the shutdown is noticed promptly.
+        return max(0.2, poll_secs / 4)
+    if eta > 4 * poll_secs:
+        # Long way off: nothing useful to learn by polling every poll_secs.
+        return min(2.0 * poll_secs, eta / 2)
+    return ramp
+
 
 # =============================
 # Cycle (your proven “all DOWN = success” logic)
 # =============================
 def _cycle(cfg: Config, target: str = "LATEST") -> int:
     check_stop()
+    _WAL_INFO_CACHE.clear()
 
     user = cfg.primary_user
     db = cfg.primary_db
@@ -1038,113 +2086,137 @@ def _cycle(cfg: Config, target: str = "LATEST") -> int:
     print(f"[DR] current={current_rp} -> target={target_rp}")
 
     instances = load_instances(cfg)
-    target_lsns = {int(s["gp_segment_id"]): str(s["restore_lsn"]).strip() for s in target_manifest["segments"]}
+    # One pool for every parallel phase of the cycle (probes, pre-flight,
+    # configure, start, and each progress tick) instead of one per phase/tick.
+    # ssh_parallelism caps it (1 runs every phase serially, in order).
+    with ThreadPoolExecutor(max_workers=min(cfg.ssh_parallelism, max(4, len(instances)))) as pool:
+        target_lsns = {int(s["gp_segment_id"]): str(s["restore_lsn"]).strip() for s in target_manifest["segments"]}
+        # Parsed once per cycle: the wait loop compares against these every tick.
+        # A malformed or missing LSN fails the cycle here, before any remote
+        # work (pre-flight included) or any instance is touched.
+        parsed_targets = {k: Lsn.parse(v) for k, v in target_lsns.items()}
+        for seg_id in instances:
+            if not target_lsns.get(seg_id):
+                raise RuntimeError(f"[DR][seg={seg_id}] target manifest missing restore_lsn")
 
-    # Pre-flight WAL availability check
-    wal_check_ok, missing_wals = _preflight_wal_check(cfg, instances, current_rp, target_rp, target_lsns)
+        # Every remote host is contacted several times this cycle; open their
+        # ssh masters together up front.
+        ssh_open_masters(inst.host for inst in instances.values() if not inst.is_local)
+
+        # Pre-flight WAL availability check
+        wal_check_ok, missing_wals = _preflight_wal_check(cfg, instances, current_rp, target_rp, target_lsns, pool)
     
-    if not wal_check_ok:
-        print("[DR] [FAIL] Pre-flight FAILED: Missing WAL files detected. Will NOT start recovery.")
-        print("[DR] Missing WAL summary:")
-        for seg_id, missing in missing_wals.items():
-            print(f"  seg={seg_id}: {len(missing)} missing, first 5: {missing[:5]}")
+        if not wal_check_ok:
+            print("[DR] [FAIL] Pre-flight FAILED: Missing WAL files detected. Will NOT start recovery.")
+            print("[DR] Missing WAL summary:")
+            for seg_id, missing in missing_wals.items():
+                print(f"  seg={seg_id}: {len(missing)} missing, first 5: {missing[:5]}")
         
-        # Write receipt for failed pre-flight
-        atomic_write_json(
-            receipts_dir / f"{target_rp}.preflight_failed.json",
-            {
-                "current_restore_point": current_rp,
-                "target_restore_point": target_rp,
-                "checked_at_utc": utc_now_iso(),
-                "status": "preflight_failed_missing_wal",
-                "missing_wals_by_segment": {str(k): v for k, v in missing_wals.items()},
-            },
-        )
-        return 0
-    
-    print("[DR] [OK] Pre-flight passed: All required WAL files are present")
-
-    # =============================
-    # Parallel Phase 1: Configure all instances
-    # =============================
-    print("[DR] Applying recovery_target_name and recovery_target_action='shutdown'...")
-    with ThreadPoolExecutor(max_workers=min(len(instances), 32)) as executor:
-        futures = {}
-        for seg_id, inst in instances.items():
-            tgt_lsn = target_lsns.get(seg_id)
-            if not tgt_lsn:
-                raise RuntimeError(f"[DR][seg={seg_id}] target manifest missing restore_lsn")
-            
-            future = executor.submit(
-                configure_instance_recovery,
-                inst,
-                cfg.gp_home,
-                target_rp,
+            # Write receipt for failed pre-flight
+            _write_receipt(
+                receipts_dir / f"{target_rp}.preflight_failed.json",
+                {
+                    "current_restore_point": current_rp,
+                    "target_restore_point": target_rp,
+                    "checked_at_utc": utc_now_iso(),
+                    "status": "preflight_failed_missing_wal",
+                    "missing_wals_by_segment": {str(k): v for k, v in missing_wals.items()},
+                },
             )
-            futures[future] = seg_id
-        
-        # Wait for all configurations to complete - fail fast on exceptions
-        for future in as_completed(futures):
-            try:
-                future.result()
-            except Exception as e:
-                seg_id = futures[future]
-                label = "[coord]" if seg_id == -1 else f"[seg={seg_id}]"
-                print(f"[DR]{label} Configuration failed: {e}")
-                raise
+            return 0
+    
+        print("[DR] [OK] Pre-flight passed: All required WAL files are present")
 
-    # =============================
-    # Parallel Phase 2: Stop, preflight, and start all instances
-    # =============================
-    print("[DR] Starting all instances in utility mode...")
-    with ThreadPoolExecutor(max_workers=min(len(instances), 32)) as executor:
-        futures = {}
-        for seg_id, inst in instances.items():
-            future = executor.submit(
-                start_instance,
-                inst,
-                cfg.gp_home,
+        # =============================
+        # Parallel Phase 1: Configure instances not already at the target
+        # (one task per local instance / per remote host)
+        # =============================
+        floor_cache = _LsnCache(ttl=2 * cfg.consumer_reach_poll_secs)
+        # check_instance_progress arguments don't change between ticks. A hung
+        # instance can't hold a tick up for longer than a poll interval.
+        sql_timeout = float(max(1, cfg.consumer_reach_poll_secs))
+        progress_args = {
+            seg_id: (inst, cfg.gp_home, user, db, parsed_targets[seg_id], floor_cache, sql_timeout)
+            for seg_id, inst in instances.items()
+        }
+
+        # An instance already down at the target (controldata past the target
+        # LSN and its log showing the stop at target_rp, e.g. a re-run after the
+        # state file failed to advance) is left alone: no conf edit, no restart.
+        # Between daemon cycles instances sit stopped at the last target, so
+        # their pg_control stamps (and controldata, where changed) are fetched
+        # per host up front; unchanged ones reuse the previous cycle's reads.
+        prefetch_controldata(instances, cfg.gp_home, pool)
+        probes = _map_instances(instances, lambda inst: check_instance_progress(*progress_args[inst.gp_segment_id]), pool)
+        pending = {
+            seg_id: inst for seg_id, inst in instances.items()
+            if not (probes[seg_id][0] and probes[seg_id][1] is None and probes[seg_id][2] == target_rp)
+        }
+        for seg_id in instances.keys() - pending.keys():
+            _log(f"[DR]{_get_instance_label(instances[seg_id])} Already stopped at {target_rp}; skipping restart")
+
+        if pending:
+            print("[DR] Applying recovery_target_name and recovery_target_action='shutdown'...")
+            single, by_host = _split_by_host(pending, group_coordinator=True)
+            _run_tasks(
+                [(_get_instance_label(i), configure_instance_recovery, (i, cfg.gp_home, target_rp)) for i in single]
+                + [(f"[host={h}]", configure_host_recovery, (h, insts, target_rp)) for h, insts in by_host.items()],
+                "Configuration failed",
+                pool,
             )
-            futures[future] = seg_id
-        
-        # Wait for all starts to complete - fail fast on exceptions
-        for future in as_completed(futures):
-            try:
-                future.result()
-            except Exception as e:
-                seg_id = futures[future]
-                label = "[coord]" if seg_id == -1 else f"[seg={seg_id}]"
-                print(f"[DR]{label} Start failed: {e}")
-                raise
+            single, by_host = _split_by_host(pending)
+
+            # =============================
+            # Parallel Phase 2: Stop, preflight, and start pending instances
+            # =============================
+            print("[DR] Starting instances in utility mode...")
+            _run_tasks(
+                [(_get_instance_label(i), start_instance, (i, cfg.gp_home)) for i in single]
+                + [(f"[host={h}]", start_host_instances, (h, insts, cfg.gp_home)) for h, insts in by_host.items()],
+                "Start failed",
+                pool,
+            )
+            # floors cached by the probe predate the restart
+            for inst in pending.values():
+                floor_cache.invalidate((inst.gp_segment_id, inst.data_dir))
 
-    print(
-        f"[DR] Waiting for shutdown-at-target confirmation "
-        f"(max_wait_secs={cfg.consumer_wait_reach_secs} poll_secs={cfg.consumer_reach_poll_secs})..."
-    )
+        print(
+            f"[DR] Waiting for shutdown-at-target confirmation "
+            f"(max_wait_secs={cfg.consumer_wait_reach_secs} poll_secs={cfg.consumer_reach_poll_secs})..."
+        )
 
-    waited = 0
-    while waited <= cfg.consumer_wait_reach_secs:
-        check_stop()
+        # Adaptive backoff: poll soon after the restart (recovery to a nearby
+        # restore point is often quick), then back off to consumer_reach_poll_secs.
+        # Once replay progress is observable, the interval follows the slowest
+        # instance's ETA instead (see _next_poll_delay). The first probe runs
+        # immediately, and the budget is a monotonic deadline, so time spent
+        # in the probes themselves counts and the last sleep never overshoots.
+        started = time.monotonic()
+        deadline = started + cfg.consumer_wait_reach_secs
+        delay = 0.0
+        last_replay: Dict[int, Tuple[float, int]] = {}  # seg_id -> (sampled_at, replay LSN)
+        down: Dict[int, DrInstance] = {}  # instances seen down on the previous tick
+        while True:
+            check_stop()
+            waited = time.monotonic() - started
+            # Only instances already down last tick are likely to read
+            # pg_control this tick; up ones answer over SQL.
+            prefetch_controldata(down, cfg.gp_home, pool)
+            down = {}
         
-        # =============================
-        # Parallel Phase 3: Check progress of all instances
-        # =============================
-        all_reached_target = True
-        all_instances_down = True
+            # =============================
+            # Parallel Phase 3: Check progress of all instances
+            # =============================
+            all_reached_target = True
+            all_instances_down = True
+            etas: List[float] = []
+            eta_known = True
+            tick_rps: Dict[int, Optional[str]] = {}
         
-        with ThreadPoolExecutor(max_workers=min(len(instances), 32)) as executor:
-            futures = {}
-            for seg_id, inst in instances.items():
-                tgt_lsn = target_lsns[seg_id]
-                future = executor.submit(
-                    check_instance_progress,
-                    inst,
-                    cfg.gp_home,
-                    user,
-                    db,
-                    tgt_lsn,
-                )
-                futures[future] = seg_id
+            futures = {
+                pool.submit(check_instance_progress, *args): seg_id
+                for seg_id, args in progress_args.items()
+            }
             
             # Collect results - fail fast on exceptions
             for future in as_completed(futures):
@@ -1153,72 +2225,102 @@ def _cycle(cfg: Config, target: str = "LATEST") -> int:
                     if not reached_target:
                         all_reached_target = False
                     # If replay_lsn is not None, instance is UP (still recovering)
+                    seg_id = futures[future]
                     if replay_lsn is not None:
                         all_instances_down = False
+                    else:
+                        down[seg_id] = instances[seg_id]
+                    tick_rps[seg_id] = recovery_point
+                    if reached_target:
+                        etas.append(0.0)
+                        continue
+                    try:
+                        now_val = lsn_to_int(replay_lsn) if replay_lsn else None
+                    except ValueError:
+                        now_val = None
+                    if now_val is None:
+                        eta_known = False
+                        continue
+                    now_t = time.monotonic()
+                    prev = last_replay.get(seg_id)
+                    last_replay[seg_id] = (now_t, now_val)
+                    if prev is None or now_val <= prev[1]:
+                        eta_known = False
+                    else:
+                        rate = (now_val - prev[1]) / max(now_t - prev[0], 1e-3)
+                        etas.append((parsed_targets[seg_id].val - now_val) / rate)
                 except Exception as e:
                     seg_id = futures[future]
                     label = "[coord]" if seg_id == -1 else f"[seg={seg_id}]"
-                    print(f"[DR]{label} Progress check failed: {e}")
+                    _log(f"[DR]{label} Progress check failed: {e}")
                     raise
 
-        # Proceed to validation if all instances are DOWN, even if they didn't all reach target
-        # The validation will determine if they stopped at the correct restore point
-        if all_instances_down:
-            # Validate recovery points from logs
-            print("[DR] All instances DOWN. Validating recovery points from logs...")
-            rp_match, recovery_points = _validate_recovery_points(instances, target_rp)
+            # Proceed to validation if all instances are DOWN, even if they didn't all reach target
+            # The validation will determine if they stopped at the correct restore point
+            if all_instances_down:
+                # Validate recovery points from logs, reusing the ones this
+                # tick's progress checks already read
+                print("[DR] All instances DOWN. Validating recovery points from logs...")
+                rp_match, recovery_points = _validate_recovery_points(instances, target_rp, tick_rps, pool)
             
-            if rp_match:
-                print(f"[DR] [OK] SUCCESS: All segments stopped at restore point '{target_rp}'. Advancing state.")
-                _set_current_restore_point(cfg, target_rp)
-                atomic_write_json(
-                    receipts_dir / f"{target_rp}.receipt.json",
-                    {
-                        "current_restore_point": current_rp,
-                        "target_restore_point": target_rp,
-                        "checked_at_utc": utc_now_iso(),
-                        "mode": "shutdown",
-                        "status": "success_recovery_point_validated",
-                        "waited_secs": waited,
-                        "target_lsns": {str(k): v for k, v in target_lsns.items()},
-                        "recovery_points": {str(k): v for k, v in recovery_points.items()},
-                    },
-                )
-                return 0
-            else:
-                print(f"[DR] ⚠️  All instances DOWN but recovery points don't match. Will retry next cycle.")
-                atomic_write_json(
-                    receipts_dir / f"{target_rp}.recovery_point_mismatch.json",
-                    {
-                        "current_restore_point": current_rp,
-                        "target_restore_point": target_rp,
-                        "checked_at_utc": utc_now_iso(),
-                        "mode": "shutdown",
-                        "status": "recovery_point_mismatch",
-                        "waited_secs": waited,
-                        "target_lsns": {str(k): v for k, v in target_lsns.items()},
-                        "actual_recovery_points": {str(k): v for k, v in recovery_points.items()},
-                    },
-                )
-                return 0
-
-        time.sleep(cfg.consumer_reach_poll_secs)
-        waited += cfg.consumer_reach_poll_secs
-
-    print("[DR] Timeout. Will retry next cycle.")
-    atomic_write_json(
-        receipts_dir / f"{target_rp}.receipt.json",
-        {
-            "current_restore_point": current_rp,
-            "target_restore_point": target_rp,
-            "checked_at_utc": utc_now_iso(),
-            "mode": "shutdown",
-            "status": "timeout",
-            "waited_secs": waited,
-            "target_lsns": {str(k): v for k, v in target_lsns.items()},
-        },
-    )
-    return 0
+                if rp_match:
+                    print(f"[DR] [OK] SUCCESS: All segments stopped at restore point '{target_rp}'. Advancing state.")
+                    _set_current_restore_point(cfg, target_rp)
+                    _write_receipt(
+                        receipts_dir / f"{target_rp}.receipt.json",
+                        {
+                            "current_restore_point": current_rp,
+                            "target_restore_point": target_rp,
+                            "checked_at_utc": utc_now_iso(),
+                            "mode": "shutdown",
+                            "status": "success_recovery_point_validated",
+                            "waited_secs": int(waited),
+                            "target_lsns": {str(k): v for k, v in target_lsns.items()},
+                            "recovery_points": {str(k): v for k, v in recovery_points.items()},
+                        },
+                    )
+                    return 0
+                else:
+                    print(f"[DR] ⚠️  All instances DOWN but recovery points don't match. Will retry next cycle.")
+                    _write_receipt(
+                        receipts_dir / f"{target_rp}.recovery_point_mismatch.json",
+                        {
+                            "current_restore_point": current_rp,
+                            "target_restore_point": target_rp,
+                            "checked_at_utc": utc_now_iso(),
+                            "mode": "shutdown",
+                            "status": "recovery_point_mismatch",
+                            "waited_secs": int(waited),
+                            "target_lsns": {str(k): v for k, v in target_lsns.items()},
+                            "actual_recovery_points": {str(k): v for k, v in recovery_points.items()},
+                        },
+                    )
+                    return 0
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            delay = _next_poll_delay(
+                delay, float(cfg.consumer_reach_poll_secs), max(etas) if eta_known and etas else None
+            )
+            # A last probe lands on the deadline itself
+            sleep_or_stop(min(delay, remaining))
+
+        waited = time.monotonic() - started
+        print("[DR] Timeout. Will retry next cycle.")
+        _write_receipt(
+            receipts_dir / f"{target_rp}.receipt.json",
+            {
+                "current_restore_point": current_rp,
+                "target_restore_point": target_rp,
+                "checked_at_utc": utc_now_iso(),
+                "mode": "shutdown",
+                "status": "timeout",
+                "waited_secs": int(waited),
+                "target_lsns": {str(k): v for k, v in target_lsns.items()},
+            },
+        )
+        return 0
 
 
 # =============================
@@ -1236,6 +2338,29 @@ def run_once(cfg: Config, target: str = "LATEST") -> int:
     except Exception as e:
         print(f"[DR] ERROR: {e}", file=sys.stderr)
         return 2
+    finally:
+        close_psql_sessions()
+        _flush_receipts()
+
+
+def _wait_for_next_cycle(cfg: Config, target: str) -> None:
+    """
+    Wait up to consumer_sleep_secs, returning early when a manifest lands.
+    Local manifests are watched with inotify; remote manifests (fetched via
+    manifest_fetch_command) or a missing inotify fall back to polling.
+    """
+    if not cfg.manifest_fetch_command:
+        watch_dir = str(Path(cfg.latest_path).parent) if target == "LATEST" else cfg.manifest_dir
+        try:
+            name = wait_for_new_file(watch_dir, cfg.consumer_sleep_secs)
+            if name:
+                print(f"[DR] manifest change detected: {name}")
+            return
+        except OSError as e:
+            print(f"[DR] inotify unavailable ({e}); polling every {cfg.consumer_sleep_secs}s")
+
+    # one wait on the stop event: no idle wakeups, and a stop ends it at once
+    sleep_or_stop(cfg.consumer_sleep_secs)
 
 
 def run_daemon(cfg: Config, target: str = "LATEST") -> int:
@@ -1249,13 +2374,12 @@ def run_daemon(cfg: Config, target: str = "LATEST") -> int:
                 raise
             except Exception as e:
                 print(f"[DR] ERROR: {e}", file=sys.stderr)
+            finally:
+                # the next cycle restarts instances; don't hold connections
+                close_psql_sessions()
+                _evict_gone_manifests()
 
-            # sleep in small chunks so stop is responsive
-            slept = 0
-            while slept < cfg.consumer_sleep_secs:
-                check_stop()
-                time.sleep(1)
-                slept += 1
+            _wait_for_next_cycle(cfg, target)
 
     except ShutdownRequested as e:
         print(f"[stop] {e.reason}")
@@ -1264,4 +2388,6 @@ def run_daemon(cfg: Config, target: str = "LATEST") -> int:
         print("[stop] keyboard_interrupt")
         return 0
     finally:
+        _flush_receipts()
+        ssh_close_masters()
         remove_pid(cfg, "dr", pid)
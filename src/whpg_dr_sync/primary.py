@@ -2,18 +2,16 @@
 from __future__ import annotations
 
 import sys
-import time
-import json
 import os
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Dict, List
 
-from .common import atomic_write_json, psql, psql_util, ssh_test_file, utc_now_iso
+from .common import atomic_write_json, json_loads, psql, psql_util, ssh_test_files_batch, utc_now_iso
 from .config import Config
 from .service import write_pid, remove_pid
-from .common import check_stop, ShutdownRequested
+from .common import check_stop, sleep_or_stop, ssh_close_masters, ShutdownRequested
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 @dataclass(frozen=True)
@@ -138,7 +136,7 @@ def archiver_stats_cluster(primary: PrimaryConn) -> Dict[str, Any]:
     ) foo;
     """
     raw = psql(primary.host, primary.port, primary.user, primary.db, sql).strip()
-    rows = json.loads(raw) if raw else []
+    rows = json_loads(raw) if raw else []
     any_failed_time = any(bool(r.get("last_failed_time")) for r in rows)
     return {
         "method": "cluster_pg_stat_archiver",
@@ -147,10 +145,8 @@ def archiver_stats_cluster(primary: PrimaryConn) -> Dict[str, Any]:
     }
 
 
-def _check_target(t: Dict[str, Any]) -> bool:
-    remote_path = f"{t['archive_dir']}/{t['wal_file']}"
-    present = ssh_test_file(t["archive_source_host"], remote_path)
-    return bool(present)
+def _target_path(t: Dict[str, Any]) -> str:
+    return f"{t['archive_dir']}/{t['wal_file']}"
 
 
 
@@ -233,15 +229,25 @@ def publish_one(cfg: Config, once_no_gp_switch_wal: bool = False) -> None:
         while waited <= cfg.archive_wait_max_secs:
             check_stop()
 
+            # One ssh round-trip per archive source host (several segments
+            # usually share a host), hosts checked in parallel.
+            by_host: Dict[str, List[Dict[str, Any]]] = {}
+            for t in targets:
+                by_host.setdefault(t["archive_source_host"], []).append(t)
+
             all_present = True
-            with ThreadPoolExecutor(max_workers=min(32, max(1, len(targets)))) as ex:
-                fut_map = {ex.submit(_check_target, t): t for t in targets}
+            with ThreadPoolExecutor(max_workers=min(32, max(1, len(by_host)))) as ex:
+                fut_map = {
+                    ex.submit(ssh_test_files_batch, host, [_target_path(t) for t in host_targets]): host_targets
+                    for host, host_targets in by_host.items()
+                }
                 for fut in as_completed(fut_map):
-                    t = fut_map[fut]
-                    present = fut.result()
-                    t["wal_present"] = present
-                    if not present:
-                        all_present = False
+                    present_paths = fut.result()
+                    for t in fut_map[fut]:
+                        present = _target_path(t) in present_paths
+                        t["wal_present"] = present
+                        if not present:
+                            all_present = False
 
             #all_present = True
             #for t in targets:
@@ -255,9 +261,9 @@ def publish_one(cfg: Config, once_no_gp_switch_wal: bool = False) -> None:
                 ready = True
                 break
 
-            time.sleep(cfg.archive_poll_interval_secs)
+            sleep_or_stop(cfg.archive_poll_interval_secs)
             waited += cfg.archive_poll_interval_secs
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, ShutdownRequested):
         print("\n[PRIMARY] stop requested (Ctrl+C) during archive wait. Publishing manifest as-is and exiting.")
         # fall through: we still rewrite manifest with current wal_present bits
 
@@ -285,11 +291,17 @@ def run_daemon(cfg: Config, once_no_gp_switch_wal: bool = False) -> int:
         while True:
             try:
                 publish_one(cfg, once_no_gp_switch_wal=once_no_gp_switch_wal)
+            except ShutdownRequested:
+                raise
             except Exception as e:
                 print(f"[PRIMARY] ERROR: {e}", file=sys.stderr)
-            time.sleep(cfg.publisher_sleep_secs)
+            sleep_or_stop(cfg.publisher_sleep_secs)
+    except ShutdownRequested as e:
+        print(f"[stop] {e.reason}")
+        return e.code
     except KeyboardInterrupt:
         print("\n[PRIMARY] stop requested (Ctrl+C). Exiting cleanly.")
         return 130
     finally:
+        ssh_close_masters()
         remove_pid(cfg, "primary", pid)
@@ -1,16 +1,20 @@
 from __future__ import annotations
 
+import heapq
 import json
+import os
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+from .common import json_loads
+
 
 def _read_json(path: Path) -> Optional[dict]:
     try:
         if not path.exists():
             return None
-        return json.loads(path.read_text())
+        return json_loads(path.read_bytes())
     except Exception:
         return None
 
@@ -37,10 +41,35 @@ def _fmt_ts(ts: Any) -> str:
     return s if s else "-"
 
 
-def _glob_receipts(receipts_dir: Path) -> List[Path]:
-    if not receipts_dir.exists():
+def _glob_receipts(receipts_dir: Path, n: int) -> List[Path]:
+    """
+    Newest n receipts by mtime, newest first. Single scandir pass with a
+    bounded heap instead of globbing and sorting the whole directory.
+    """
+    try:
+        with os.scandir(receipts_dir) as it:
+            entries = (e for e in it if e.name.endswith(".receipt.json"))
+            newest = heapq.nlargest(n, entries, key=lambda e: e.stat().st_mtime)
+    except (FileNotFoundError, NotADirectoryError):
         return []
-    return sorted(receipts_dir.glob("*.receipt.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    return [Path(e.path) for e in newest]
+
+
+def latest_receipt_name(receipts_dir: str) -> Optional[str]:
+    """
+    File name of the newest receipt by name (receipt names embed the restore
+    point timestamp), or None. Compares bare names; no stat, no Path objects.
+    """
+    best: Optional[str] = None
+    try:
+        with os.scandir(receipts_dir) as it:
+            for e in it:
+                n = e.name
+                if n.endswith(".receipt.json") and (best is None or n > best):
+                    best = n
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return best
 
 
 def _table(rows: List[List[str]]) -> str:
@@ -107,12 +136,12 @@ def _load_last_receipt(cfg, target_rp: str, history_n: int) -> Tuple[str, str, s
             last = r
             last_file = p.name
 
-    # Fallback: newest receipt by mtime
+    # Fallback: newest receipt (same pick as `dr logs`)
     if last is None:
-        receipts = _glob_receipts(receipts_dir)
-        if receipts:
-            last_file = receipts[0].name
-            last = _read_json(receipts[0])
+        name = latest_receipt_name(str(receipts_dir))
+        if name:
+            last_file = name
+            last = _read_json(receipts_dir / name)
 
     status = _safe_str((last or {}).get("status"), "-")
     checked = _fmt_ts((last or {}).get("checked_at_utc"))
@@ -126,7 +155,7 @@ def _load_last_receipt(cfg, target_rp: str, history_n: int) -> Tuple[str, str, s
 
     # history
     hist: List[dict] = []
-    for p in _glob_receipts(receipts_dir)[: max(1, history_n)]:
+    for p in _glob_receipts(receipts_dir, max(1, history_n)):
         r = _read_json(p)
         if r:
             r["_file"] = p.name
@@ -0,0 +1,30 @@
+import os
+import signal
+import unittest
+
+from whpg_dr_sync import cli, common
+
+
+class SignalHandlerTest(unittest.TestCase):
+    def setUp(self):
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            self.addCleanup(signal.signal, sig, signal.getsignal(sig))
+        self.addCleanup(common._STOP_EVENT.clear)
+        cli.install_signal_handlers()
+
+    def test_sigterm_requests_stop_instead_of_raising(self):
+        os.kill(os.getpid(), signal.SIGTERM)
+        self.assertTrue(common._STOP_EVENT.is_set())
+        with self.assertRaises(common.ShutdownRequested):
+            common.check_stop()
+        with self.assertRaises(common.ShutdownRequested):
+            common.sleep_or_stop(30)
+
+    def test_second_signal_interrupts(self):
+        os.kill(os.getpid(), signal.SIGTERM)
+        with self.assertRaises(KeyboardInterrupt):
+            os.kill(os.getpid(), signal.SIGINT)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import subprocess
+import tempfile
+import unittest
+
+from whpg_dr_sync import dr
+from whpg_dr_sync.config import Instance
+
+EDITS = [
+    ("recovery_target_name", "recovery_target_name = 'sync_point_B'"),
+    ("recovery_target_action", "recovery_target_action = 'shutdown'"),
+]
+
+CONFS = {
+    "plain": b"port = 5432\nrecovery_target_name = 'sync_point_A'\n",
+    "crlf": b"port = 5432\r\nrecovery_target_name = 'sync_point_A'\r\nwork_mem = 4MB\r\n",
+    "no_trailing_newline": b"port = 5432\nrecovery_target_name = 'sync_point_A'",
+    "odd_separators": "a = 1\x0cb = 2\x1c c = 3\x0b\nrecovery_target_name = 'x'\n".encode(),
+    "latin1": b"cluster_name = 'caf\xe9'\nrecovery_target_name = 'sync_point_A'\n",
+    "blank_lines": b"\n\nport = 5432\n\n",
+    "empty": b"",
+    "already_set": b"port = 5432\nrecovery_target_name = 'sync_point_B'\nrecovery_target_action = 'shutdown'\n",
+    "already_set_no_trailing_newline": (
+        b"recovery_target_name = 'sync_point_B'\nrecovery_target_action = 'shutdown'"
+    ),
+}
+
+
+class EditConfLocalMatchesAwkTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _conf(self, name, data):
+        data_dir = os.path.join(self.tmp.name, name)
+        os.makedirs(data_dir)
+        path = os.path.join(data_dir, "postgresql.conf")
+        with open(path, "wb") as f:
+            f.write(data)
+        return data_dir, path
+
+    def _check(self, name, data, edits):
+        data_dir, local_conf = self._conf(name + "_local", data)
+        _, awk_conf = self._conf(name + "_awk", data)
+        changed = dr.edit_conf(Instance(0, "127.0.0.1", 5432, data_dir, True), edits)
+        p = subprocess.run(
+            ["bash", "-c", "set -euo pipefail; " + dr.rewrite_conf_kvs(awk_conf, edits)],
+            capture_output=True,
+            stdin=subprocess.DEVNULL,
+            check=True,
+        )
+        with open(local_conf, "rb") as f, open(awk_conf, "rb") as g:
+            self.assertEqual(f.read(), g.read())
+        self.assertEqual(changed, p.stdout.strip() == b"CHANGED")
+
+    def test_local_and_awk_write_identical_bytes(self):
+        for name, data in CONFS.items():
+            for edits in (EDITS, EDITS[:1]):
+                with self.subTest(conf=name, edits=len(edits)):
+                    self._check(f"{name}_{len(edits)}", data, edits)
+
+    def test_reapplying_edits_leaves_file_alone(self):
+        data_dir, path = self._conf("again", CONFS["crlf"])
+        inst = Instance(0, "127.0.0.1", 5432, data_dir, True)
+        self.assertTrue(dr.edit_conf(inst, EDITS))
+        self.assertFalse(dr.edit_conf(inst, EDITS))
+        with open(path, "rb") as f:
+            self.assertIn(b"work_mem = 4MB\r\n", f.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
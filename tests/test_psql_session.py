@@ -0,0 +1,104 @@
+import os
+import sys
+import tempfile
+import textwrap
+import unittest
+from unittest import mock
+
+from whpg_dr_sync import common
+
+# Stands in for psql: stdin (or -c) lines are "queries". PID prints the
+# process id, MULTI two lines, WARN only writes to stderr, FAIL errors out
+# the way ON_ERROR_STOP does; anything else echoes back as r:<line>.
+FAKE_PSQL = textwrap.dedent(
+    """\
+    #!{python}
+    import os
+    import sys
+
+    def answer(line):
+        line = line.rstrip(";")
+        if line == "PID":
+            print(os.getpid())
+        elif line == "MULTI":
+            print("a")
+            print("b")
+        elif line == "WARN":
+            sys.stderr.write("WARNING: earlier query\\n")
+        elif line == "FAIL":
+            sys.stderr.write("ERROR: boom\\n")
+            sys.stderr.flush()
+            sys.exit(3)
+        else:
+            print("r:" + line)
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+    args = sys.argv[1:]
+    if "-c" in args:
+        answer(args[args.index("-c") + 1])
+        sys.exit(0)
+    for line in sys.stdin:
+        line = line.rstrip("\\n")
+        if line.startswith("\\\\echo "):
+            print(line[len("\\\\echo "):])
+            sys.stdout.flush()
+        else:
+            answer(line)
+    """
+)
+
+
+class PsqlSessionTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, "psql")
+        with open(path, "w") as f:
+            f.write(FAKE_PSQL.format(python=sys.executable))
+        os.chmod(path, 0o755)
+        # pgoptions "" runs psql with the inherited environment, so the
+        # patched PATH finds the fake
+        patcher = mock.patch.dict(os.environ, {"PATH": tmp.name + os.pathsep + os.environ["PATH"]})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(common.close_psql_sessions)
+        self.addCleanup(common.configure_psql, True)
+        common.close_psql_sessions()
+
+    def _psql(self, sql):
+        return common.psql("db1", 5432, "gpadmin", "postgres", sql)
+
+    def test_queries_share_one_process_and_are_framed_by_sentinel(self):
+        pid = self._psql("PID")
+        self.assertEqual(self._psql("MULTI"), "a\nb")
+        self.assertEqual(self._psql("select 1"), "r:select 1")
+        self.assertEqual(self._psql("PID"), pid)
+
+    def test_error_reports_only_the_failing_querys_stderr(self):
+        self._psql("WARN")
+        with self.assertRaises(RuntimeError) as cm:
+            self._psql("FAIL")
+        msg = str(cm.exception)
+        self.assertIn("ERROR: boom", msg)
+        self.assertNotIn("earlier query", msg)
+
+    def test_session_respawns_after_failure(self):
+        pid = self._psql("PID")
+        with self.assertRaises(RuntimeError):
+            self._psql("FAIL")
+        new_pid = self._psql("PID")
+        self.assertNotEqual(new_pid, pid)
+        self.assertEqual(self._psql("PID"), new_pid)
+
+    def test_pooling_off_runs_one_psql_per_query(self):
+        common.configure_psql(False)
+        self.assertNotEqual(self._psql("PID"), self._psql("PID"))
+        self.assertEqual(self._psql("MULTI"), "a\nb")
+        with self.assertRaises(RuntimeError) as cm:
+            self._psql("FAIL")
+        self.assertIn("ERROR: boom", str(cm.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
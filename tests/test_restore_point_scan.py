@@ -0,0 +1,76 @@
+import os
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+from whpg_dr_sync import dr
+from whpg_dr_sync.config import Instance
+
+
+def _stop_line(name):
+    return f'2026-01-01,"LOG","00000","recovery stopping at restore point ""{name}"", time 2026",,\n'
+
+
+MALFORMED = '2026-01-01,"LOG","00000","recovery stopping at restore point ",,\n'
+OTHER = '2026-01-01,"LOG","00000","database system is ready",,\n'
+
+# log/<name>.csv contents, oldest file first
+LOGS = {
+    "single": [_stop_line("sync_point_A")],
+    "latest_wins": [_stop_line("sync_point_A") + OTHER + _stop_line("sync_point_B") + OTHER],
+    "malformed_last_falls_back_in_file": [
+        _stop_line("sync_point_A"),
+        _stop_line("sync_point_B") + OTHER + MALFORMED,
+    ],
+    "only_malformed_moves_to_older_file": [_stop_line("sync_point_A"), OTHER + MALFORMED],
+    "crlf": [_stop_line("sync_point_A").replace("\n", "\r\n")],
+    "none": [OTHER, OTHER],
+}
+
+
+def _ssh_bash(host, script, check=True):
+    # runs the remote script in a local bash, the way ssh_bash feeds it
+    p = subprocess.run(
+        ["bash", "-s"], input="{\n" + script + "\n} </dev/null\n", capture_output=True, text=True
+    )
+    return p.stdout.strip()
+
+
+class RestorePointScanTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        patcher = mock.patch.object(dr, "ssh_bash", _ssh_bash)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _data_dir(self, name, files):
+        data_dir = os.path.join(self.root, name)
+        logdir = os.path.join(data_dir, "log")
+        os.makedirs(logdir)
+        for n, text in enumerate(files):
+            path = os.path.join(logdir, f"gpdb-{n}.csv")
+            with open(path, "w", newline="") as f:
+                f.write(text)
+            os.utime(path, (1000 + n, 1000 + n))
+        return data_dir
+
+    def test_remote_scan_matches_local_scan(self):
+        for name, files in LOGS.items():
+            with self.subTest(logs=name):
+                data_dir = self._data_dir(name, files)
+                local = dr.last_stopped_restore_point_scan(Instance(0, "127.0.0.1", 1, data_dir, True))
+                remote = dr.last_stopped_restore_point_scan(Instance(1, "127.0.0.1", 1, data_dir, False))
+                self.assertEqual(remote, local)
+
+    def test_malformed_latest_line_falls_back_within_file(self):
+        data_dir = self._data_dir("fallback", LOGS["malformed_last_falls_back_in_file"])
+        rp, logfile = dr.last_stopped_restore_point_scan(Instance(1, "127.0.0.1", 1, data_dir, False))
+        self.assertEqual(rp, "sync_point_B")
+        self.assertTrue(logfile.endswith("gpdb-1.csv"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import socket
+import subprocess
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from whpg_dr_sync import dr
+from whpg_dr_sync.config import Instance
+
+WAL_SEG_SIZE = 16 * 1024 * 1024
+N_WALS = 3000
+CURRENT_LSN = "0/1000000"  # end of segment 1
+TARGET_LSN = "%X/%X" % divmod((N_WALS + 1) * WAL_SEG_SIZE, 1 << 32)
+
+
+def _closed_port() -> int:
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def _local_ssh_bash(calls):
+    # ssh_bash stand-in running the script in a local bash, the way the
+    # remote side receives it (on stdin, inside a { } </dev/null group)
+    def ssh_bash(host, script, check=True):
+        calls.append(script)
+        p = subprocess.run(
+            ["bash", "-s"], input="{\n" + script + "\n} </dev/null\n", capture_output=True, text=True
+        )
+        return p.stdout.strip()
+
+    return ssh_bash
+
+
+class PreflightManyWalsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.archive = os.path.join(root, "archive")
+        os.makedirs(self.archive)
+        gp_home = os.path.join(root, "gp")
+        os.makedirs(os.path.join(gp_home, "bin"))
+        pgcd = os.path.join(gp_home, "bin", "pg_controldata")
+        with open(pgcd, "w") as f:
+            f.write(
+                "#!/bin/sh\n"
+                "echo 'Latest checkpoint location:           0/800000'\n"
+                "echo \"Latest checkpoint's TimeLineID:       1\"\n"
+                f"echo 'Minimum recovery ending location:     {CURRENT_LSN}'\n"
+                f"echo 'Bytes per WAL segment:                {WAL_SEG_SIZE}'\n"
+            )
+        os.chmod(pgcd, 0o755)
+        # remote pg_controldata runs source it first
+        open(os.path.join(gp_home, "greenplum_path.sh"), "w").close()
+
+        port = _closed_port()
+        self.local = Instance(0, "127.0.0.1", port, os.path.join(root, "d0"), True)
+        self.remote = Instance(1, "127.0.0.1", port, os.path.join(root, "d1"), False)
+        self.cfg = SimpleNamespace(
+            primary_user="gpadmin",
+            primary_db="postgres",
+            gp_home=gp_home,
+            archive_dir=self.archive,
+            wal_list_command="",
+            wal_check_command="",
+            wal_check_commands={},
+            wal_enumerate_hard_limit=250000,
+        )
+        self.names = list(dr._iter_wal_files_between_lsns(CURRENT_LSN, TARGET_LSN, 1, WAL_SEG_SIZE))
+        for name in self.names:
+            open(os.path.join(self.archive, name), "w").close()
+        dr._WAL_INFO_CACHE.clear()
+        dr._CTL_CACHE.clear()
+        self.ssh_calls = []
+        patcher = mock.patch.object(dr, "ssh_bash", _local_ssh_bash(self.ssh_calls))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    def _preflight(self, instances):
+        targets = {sid: TARGET_LSN for sid in instances}
+        return dr._preflight_wal_check(self.cfg, instances, "sync_point_A", "sync_point_B", targets)
+
+    def test_names_span_several_thousand_segments(self):
+        self.assertEqual(len(self.names), N_WALS)
+
+    def test_local_and_remote_pass_with_thousands_of_wals(self):
+        ok, missing = self._preflight({0: self.local, 1: self.remote})
+        self.assertTrue(ok)
+        self.assertEqual(missing, {})
+        checks = [c for c in self.ssh_calls if "for f in" in c]
+        self.assertEqual(len(checks), -(-N_WALS // dr._WAL_CHECK_BATCH))
+
+    def test_remote_reports_missing_wal(self):
+        gone = self.names[len(self.names) // 2]
+        os.unlink(os.path.join(self.archive, gone))
+        ok, missing = self._preflight({1: self.remote})
+        self.assertFalse(ok)
+        self.assertEqual(missing, {1: [gone]})
+
+    def test_custom_check_command_with_thousands_of_wals(self):
+        self.cfg.wal_check_command = "test -f {wal_path} && echo EXISTS"
+        ok, missing = self._preflight({0: self.local})
+        self.assertTrue(ok)
+        self.assertEqual(missing, {})
+
+
+if __name__ == "__main__":
+    unittest.main()